@@ -6,6 +6,10 @@ from Preset.Model.GameObject import registerGenericClass
 if False:
 	from ..GamingState.state.RootGamingState import RootGamingState
 	from util.BetterPlayerObject import BetterPlayerObject
+	from util.TickProfiler import TickProfiler
+	from util.InventoryKit import InventoryKit
+	from util.StateSnapshot import StateSnapshot
+	from util.FlightRecorder import FlightRecorder
 
 
 @registerGenericClass("GamingStatePart")
@@ -14,18 +18,63 @@ class GamingStatePart(PartBase):
 	def __init__(self):
 		PartBase.__init__(self)
 		from util.BetterPartUtil import BetterPartUtil
+		from util.EventRouter import EventRouter
+		from util.CommandBuffer import CommandBuffer
+		from util.ClientSoundBuffer import ClientSoundBuffer
+		from util.ComponentCache import ComponentCache
+		from util.InventoryKit import InventoryKitQueue
+		from util.PlayerHud import PlayerHud
 		# 零件名称
 		self.name = "游戏状态机"
 		self.root_state = None  # type: RootGamingState | None
+		# 竞技场：同一零件中互相独立的多个根状态 arena_id -> RootGamingState
+		self.arenas = {}  # type: dict[str, RootGamingState]
+		# 竞技场的tick顺序，轮流作为第一个被tick的竞技场
+		self.arena_order = list()  # type: list[RootGamingState]
+		self.arena_cursor = 0  # type: int
+		# 每个tick最多tick的竞技场数，为None时每个tick都tick全部竞技场
+		self.arena_tick_budget = None  # type: int | None
+		# 玩家或实体所在的竞技场 member_id -> arena_id
+		self.member_arenas = {}  # type: dict[str, str]
 		self.better_util = BetterPartUtil(self)
+		# 玩家对象的缓存，在玩家离开时移除
 		self.cached_better_players = {}  # type: dict[str, BetterPlayerObject]
+		# 状态的事件监听统一经过路由表分发，每个事件只向引擎注册一次
+		self.event_router = EventRouter(self)
+		# SetCommand的每tick缓冲，默认关闭
+		self.command_buffer = CommandBuffer(self)
+		# 引擎组件的缓存，玩家离开时移除该玩家的组件
+		self.component_cache = ComponentCache(self)
+		# 物品套装的发放队列
+		self.kit_queue = InventoryKitQueue(self)
+		# play_client_sound的每tick合并，默认开启
+		self.client_sound_buffer = ClientSoundBuffer(self)
+		# 每个玩家的HUD内容，内容不变时跳过重复发送
+		self.hud = PlayerHud(self)
+		# 客户端播放声音使用的音频组件，以及延迟播放使用的游戏组件，第一次使用时创建
+		self.client_audio_comp = None
+		self.client_game_comp = None
+		# 状态回调的耗时统计，默认关闭（None）
+		self.profiler = None  # type: TickProfiler | None
+		# 运行路径的快照，默认关闭（None）
+		self.state_snapshot = None  # type: StateSnapshot | None
+		# 状态切换的记录，默认关闭（None）
+		self.flight_recorder = None  # type: FlightRecorder | None
+		# 延迟切换每个tick最多处理的轮数，默认关闭（None）时立即切换
+		self.deferred_transition_cascades = None  # type: int | None
+		# 根状态的时钟设置 (mode, tick_seconds)，默认（None）为真实时间
+		self.clock_settings = None  # type: tuple[str, float] | None
+		# 服务端已经执行的tick数
+		self.tick_number = 0  # type: int
 
 	def InitClient(self):
 		"""
 		@description 客户端的零件对象初始化入口
 		"""
+		from util.ClientSoundBuffer import EVENT_PLAY_SOUND, EVENT_PLAY_SOUND_BATCH
 		PartBase.InitClient(self)
-		self.ListenSelfEvent('S2CPlaySoundEvent', self, self.client_play_sound_event)
+		self.ListenSelfEvent(EVENT_PLAY_SOUND, self, self.client_play_sound_event)
+		self.ListenSelfEvent(EVENT_PLAY_SOUND_BATCH, self, self.client_play_sound_batch_event)
 
 	def InitServer(self):
 		"""
@@ -34,14 +83,28 @@ class GamingStatePart(PartBase):
 		from state.RootGamingState import RootGamingState
 		PartBase.InitServer(self)
 		self.root_state = RootGamingState(self)
+		self.ListenForEngineEvent('AddServerPlayerEvent', self, self.server_on_add_server_player)
 		self.ListenForEngineEvent('DelServerPlayerEvent', self, self.server_on_del_server_player)
 
+	def server_on_add_server_player(self, args):
+		"""
+		@description 服务端玩家加入游戏事件
+		"""
+		self.command_buffer.forget(args['id'])
+		self.hud.join(args['id'])
+
 	def server_on_del_server_player(self, args):
 		"""
 		@description 服务端玩家离开游戏事件
 		"""
-		return
-		# self.cached_better_players.pop(args['id'])
+		self.cached_better_players.pop(args['id'], None)
+		self.command_buffer.forget(args['id'])
+		self.better_util.forget_player(args['id'])
+		self.client_sound_buffer.forget(args['id'])
+		self.component_cache.evict(args['id'])
+		self.kit_queue.forget(args['id'])
+		self.hud.forget(args['id'])
+		self.member_arenas.pop(args['id'], None)
 
 	def TickClient(self):
 		"""
@@ -52,28 +115,345 @@ class GamingStatePart(PartBase):
 	def client_play_sound_event(self, args):
 		if args['player_id'] != self.GetLocalPlayerId():
 			return
+		self.client_play_sound(args['sound'], args['pos'], args['volume'], args['pitch'], args['loop'], args.get('delay', 0))
+
+	def client_play_sound_batch_event(self, args):
+		if args['player_id'] != self.GetLocalPlayerId():
+			return
+		for sound, pos, volume, pitch, loop, delay in args['sounds']:
+			self.client_play_sound(sound, pos, volume, pitch, loop, delay)
+
+	def client_play_sound(self, sound, pos, volume=1, pitch=1, loop=False, delay=0):
+		"""
+		@description 在客户端播放声音
+		:param delay: 延迟播放的时间（秒）
+		:type delay: float
+		"""
 		import mod.client.extraClientApi as clientApi
-		comp = clientApi.GetEngineCompFactory().CreateCustomAudio(self.GetLevelId())
-		comp.PlayCustomMusic(args['sound'], args['pos'], args['volume'], args['pitch'], args['loop'], None)
+		if delay > 0:
+			if self.client_game_comp is None:
+				self.client_game_comp = clientApi.GetEngineCompFactory().CreateGame(self.GetLevelId())
+			self.client_game_comp.AddTimer(delay, self.client_play_sound, sound, pos, volume, pitch, loop)
+			return
+		if self.client_audio_comp is None:
+			self.client_audio_comp = clientApi.GetEngineCompFactory().CreateCustomAudio(self.GetLevelId())
+		self.client_audio_comp.PlayCustomMusic(sound, pos, volume, pitch, loop, None)
 
 	def TickServer(self):
 		"""
 		@description 服务端的零件对象逻辑驱动入口
 		"""
 		PartBase.TickServer(self)
+		self.tick_number += 1
 		self.root_state.tick()
+		if self.arena_order:
+			self._tick_arenas()
+		if self.kit_queue.pending:
+			self.kit_queue.process()
+		self.command_buffer.flush()
+		self.client_sound_buffer.flush()
+		if self.state_snapshot is not None:
+			self.state_snapshot.update()
 
 	def DestroyClient(self):
 		"""
 		@description 客户端的零件对象销毁逻辑入口
 		"""
 		PartBase.DestroyClient(self)
+		self.event_router.clear()
+		self.component_cache.clear()
+		self.client_audio_comp = None
+		self.client_game_comp = None
 
 	def DestroyServer(self):
 		"""
 		@description 服务端的零件对象销毁逻辑入口
 		"""
 		PartBase.DestroyServer(self)
+		if self.state_snapshot is not None:
+			# 正常关闭时也保存最后的运行路径，重启后可以继续
+			self.state_snapshot.write()
+		self.event_router.clear()
+		self.cached_better_players.clear()
+		self.component_cache.clear()
+		self.arenas.clear()
+		del self.arena_order[:]
+		self.member_arenas.clear()
+
+	# ====== 竞技场 ======
+
+	def add_arena(self, arena_id):
+		"""
+		添加一个竞技场（运行中也可以添加），返回竞技场的根状态，用法与root_state相同
+		:param arena_id: 竞技场ID
+		:type arena_id: str
+		:rtype: RootGamingState
+		"""
+		from state.RootGamingState import RootGamingState
+		if arena_id is None or arena_id in self.arenas:
+			raise ValueError("竞技场ID {} 无效或已存在".format(arena_id))
+		arena = RootGamingState(self, arena_id)
+		if self.deferred_transition_cascades is not None:
+			arena.set_deferred_transitions(True, self.deferred_transition_cascades)
+		if self.clock_settings is not None:
+			arena.set_clock(*self.clock_settings)
+		self.arenas[arena_id] = arena
+		self.arena_order.append(arena)
+		return arena
+
+	def remove_arena(self, arena_id):
+		"""
+		移除竞技场：退出其运行中的所有状态，并移除其中的玩家和实体
+		:param arena_id: 竞技场ID
+		:type arena_id: str
+		:return: 被移除的竞技场根状态
+		:rtype: RootGamingState | None
+		"""
+		arena = self.arenas.pop(arena_id, None)
+		if arena is None:
+			return None
+		self.arena_order.remove(arena)
+		for member_id in self.get_arena_members(arena_id):
+			del self.member_arenas[member_id]
+		arena.stop()
+		return arena
+
+	def get_arena(self, arena_id):
+		"""
+		获取竞技场的根状态，arena_id为None时为默认的root_state
+		:rtype: RootGamingState | None
+		"""
+		if arena_id is None:
+			return self.root_state
+		return self.arenas.get(arena_id)
+
+	def join_arena(self, member_id, arena_id):
+		"""
+		把玩家或实体加入竞技场（会离开之前的竞技场），带有该ID的事件只会分发给这个竞技场中的状态
+		:param member_id: 玩家ID或实体ID
+		:type member_id: str
+		:param arena_id: 竞技场ID
+		:type arena_id: str
+		"""
+		if arena_id not in self.arenas:
+			raise ValueError("竞技场 {} 不存在".format(arena_id))
+		self.member_arenas[member_id] = arena_id
+
+	def leave_arena(self, member_id):
+		"""
+		把玩家或实体移出所在的竞技场
+		:return: 之前所在的竞技场ID
+		:rtype: str | None
+		"""
+		return self.member_arenas.pop(member_id, None)
+
+	def get_member_arena(self, member_id):
+		"""
+		获取玩家或实体所在的竞技场ID
+		:rtype: str | None
+		"""
+		return self.member_arenas.get(member_id)
+
+	def get_arena_members(self, arena_id):
+		"""
+		获取竞技场中的所有玩家和实体ID
+		:rtype: list[str]
+		"""
+		return [member_id for member_id, member_arena_id in self.member_arenas.items() if member_arena_id == arena_id]
+
+	def _tick_arenas(self):
+		# 轮流从不同的竞技场开始tick，设置了arena_tick_budget时每个tick只tick一部分
+		arenas = self.arena_order
+		count = len(arenas)
+		start = self.arena_cursor % count
+		budget = count if self.arena_tick_budget is None else min(self.arena_tick_budget, count)
+		selected = [arenas[(start + i) % count] for i in range(budget)]
+		self.arena_cursor = (start + (1 if self.arena_tick_budget is None else budget)) % count
+		for arena in selected:
+			# tick中可能移除了竞技场
+			if self.arenas.get(arena.arena_id) is arena:
+				arena.tick()
+
+	def enable_command_buffer(self, enabled=True):
+		"""
+		开启或关闭SetCommand的每tick缓冲
+		开启后title/actionbar等命令会在TickServer结束时合并发送，可通过command_buffer.get_stats()查看合并效果
+		:param enabled: 是否开启
+		:type enabled: bool
+		"""
+		if not enabled:
+			self.command_buffer.flush()
+		self.command_buffer.enabled = enabled
+
+	def apply_inventory_kit(self, kit, players, players_per_tick=None):
+		"""
+		把物品套装发给多个玩家，每个玩家只发送有变化的格子
+		:param kit: 物品套装
+		:type kit: InventoryKit
+		:param players: 玩家ID或玩家对象的集合
+		:type players: list[str | BetterPlayerObject]
+		:param players_per_tick: 每个tick最多发放的玩家数，为None时立即全部发放
+		:type players_per_tick: int | None
+		"""
+		for player in players:
+			player_id = player if isinstance(player, (str, unicode)) else player.GetPlayerId()
+			if players_per_tick is None:
+				self.kit_queue.apply(kit, player_id)
+			else:
+				self.kit_queue.push(kit, player_id)
+		if players_per_tick is not None:
+			self.kit_queue.players_per_tick = players_per_tick
+
+	def enable_client_sound_batching(self, enabled=True):
+		"""
+		开启或关闭play_client_sound的每tick合并（默认开启）
+		关闭后每次播放都会立即单独发送一个事件
+		:param enabled: 是否开启
+		:type enabled: bool
+		"""
+		if not enabled:
+			self.client_sound_buffer.flush()
+		self.client_sound_buffer.enabled = enabled
+
+	def enable_profiler(self, enabled=True, slow_threshold_ms=10.0):
+		"""
+		开启或关闭状态回调的耗时统计，可在运行中随时切换
+		:param enabled: 是否开启
+		:type enabled: bool
+		:param slow_threshold_ms: 慢回调阈值（毫秒），超过时输出日志，为None时不输出
+		:type slow_threshold_ms: float | None
+		"""
+		if not enabled:
+			self.profiler = None
+		elif self.profiler is None:
+			from util.TickProfiler import TickProfiler
+			self.profiler = TickProfiler(self, slow_threshold_ms)
+		else:
+			self.profiler.slow_threshold_ms = slow_threshold_ms
+
+	def enable_snapshot(self, enabled=True, file_path='gaming_state_snapshot.json', refresh_interval=5.0):
+		"""
+		开启或关闭运行路径的快照，开启后运行路径变化时会写入快照文件，用于服务器重启后通过restore_snapshot继续比赛
+		:param enabled: 是否开启
+		:type enabled: bool
+		:param file_path: 快照文件路径
+		:type file_path: str
+		:param refresh_interval: 运行路径没有变化时，刷新剩余时间的间隔（秒），为None时不刷新
+		:type refresh_interval: float | None
+		"""
+		if not enabled:
+			self.state_snapshot = None
+		else:
+			from util.StateSnapshot import StateSnapshot
+			self.state_snapshot = StateSnapshot(self, file_path, refresh_interval)
+
+	def restore_snapshot(self, file_path='gaming_state_snapshot.json'):
+		"""
+		从快照文件恢复运行路径（在InitServer中添加好子状态和竞技场之后调用），不会执行快照之前的状态
+		例如：if not self.restore_snapshot(): self.root_state.next_sub_state()
+		:param file_path: 快照文件路径
+		:type file_path: str
+		:return: root_state是否从快照恢复
+		:rtype: bool
+		"""
+		from util.StateSnapshot import StateSnapshot
+		data = StateSnapshot.load(file_path)
+		if data is None:
+			return False
+		restored = False
+		for root in [self.root_state] + self.arena_order:
+			record = data['roots'].get(root.get_path_name())
+			if record is None:
+				continue
+			if StateSnapshot.restore_root(root, record) and root is self.root_state:
+				restored = True
+		return restored
+
+	def enable_deferred_transitions(self, enabled=True, max_cascades=8):
+		"""
+		开启或关闭所有根状态（root_state和竞技场）的延迟切换：next_sub_state/toggle_sub_state在tick回调全部执行完之后才切换，
+		同一状态在一个tick中的多次切换合并为最终的目标
+		:param enabled: 是否开启，关闭时立即执行还没有执行的切换
+		:type enabled: bool
+		:param max_cascades: 每个tick最多处理的连续切换轮数（切换后进入的状态又请求切换为一轮），超过时剩余的切换留到下一个tick
+		:type max_cascades: int
+		"""
+		self.deferred_transition_cascades = max_cascades if enabled else None
+		for root in [self.root_state] + self.arena_order:
+			if root is not None:
+				root.set_deferred_transitions(enabled, max_cascades)
+
+	def build_state_tree(self, tree, arena_id=None):
+		"""
+		按声明式的描述给根状态添加整棵状态树，状态类使用 "模块:类名" 引用，在第一次进入时才导入（格式见StateTree.build_state_tree）
+		描述可以是dict，也可以是JSON字符串（例如零件自定义变量中配置的状态树）
+		:param tree: dict 或 JSON字符串
+		:type tree: dict | str
+		:param arena_id: 竞技场ID，为None时为root_state
+		:type arena_id: str | None
+		:return: 根状态（需要自行调用next_sub_state启动）
+		:rtype: RootGamingState
+		"""
+		from state.StateTree import build_state_tree
+		root = self.get_arena(arena_id)
+		if root is None:
+			raise ValueError("竞技场 {} 不存在".format(arena_id))
+		return build_state_tree(root, tree)
+
+	def set_clock(self, mode, tick_seconds=0.05):
+		"""
+		设置所有根状态（root_state和竞技场）的时钟，TimedGamingState的计时和schedule_after等定时任务都使用这个时钟
+		:param mode: 'wall' 真实时间（默认）、'ticks' 每个tick固定前进tick_seconds秒、'virtual' 只通过根状态的advance_clock前进
+		:type mode: str
+		:param tick_seconds: 'ticks'时每个tick前进的时间（秒）
+		:type tick_seconds: float
+		"""
+		self.clock_settings = (mode, tick_seconds)
+		for root in [self.root_state] + self.arena_order:
+			if root is not None:
+				root.set_clock(mode, tick_seconds)
+
+	def enable_flight_recorder(self, enabled=True, capacity=1024, file_path='gaming_state_flight.json', dump_on_error=True):
+		"""
+		开启或关闭状态切换的记录，可在运行中随时切换
+		:param enabled: 是否开启
+		:type enabled: bool
+		:param capacity: 最多保留的记录数（环形缓冲区）
+		:type capacity: int
+		:param file_path: 导出文件路径
+		:type file_path: str
+		:param dump_on_error: 状态回调出错时是否自动导出
+		:type dump_on_error: bool
+		"""
+		if not enabled:
+			self.flight_recorder = None
+		else:
+			from util.FlightRecorder import FlightRecorder
+			self.flight_recorder = FlightRecorder(self, capacity, file_path, dump_on_error)
+
+	def dump_flight_recorder(self, file_path=None):
+		"""
+		将状态切换记录写入JSON文件
+		:param file_path: 文件路径，为None时使用开启时指定的路径
+		:type file_path: str | None
+		:return: 按时间顺序的切换记录，没有开启记录时返回None
+		:rtype: list[dict] | None
+		"""
+		if self.flight_recorder is None:
+			return None
+		return self.flight_recorder.dump(file_path)
+
+	def dump_profile(self, file_path='gaming_state_profile.json'):
+		"""
+		将耗时统计报告写入JSON文件
+		:param file_path: 文件路径
+		:type file_path: str
+		:return: 统计报告，没有开启统计时返回None
+		:rtype: dict | None
+		"""
+		if self.profiler is None:
+			return None
+		return self.profiler.dump(file_path)
 
 	def get_all_better_players(self):
 		"""
@@ -92,9 +472,11 @@ class GamingStatePart(PartBase):
 		:type player_id: str
 		:rtype: BetterPlayerObject
 		"""
-		from util.BetterPlayerObject import BetterPlayerObject
-		# player_obj = self.cached_better_players.get(player_id)
-		# if player_obj is None:
-		# 	player_obj = BetterPlayerObject(self, self.GetPlayerObject(player_id))
-		# 	self.cached_better_players[player_id] = player_obj
-		return BetterPlayerObject(self, self.GetPlayerObject(player_id))
+		better_player = self.cached_better_players.get(player_id)
+		if better_player is None:
+			from util.BetterPlayerObject import BetterPlayerObject
+			player_obj = self.GetPlayerObject(player_id)
+			better_player = BetterPlayerObject(self, player_obj)
+			if player_obj is not None:
+				self.cached_better_players[player_id] = better_player
+		return better_player
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+事件派发性能：运行路径上的每一层状态都通过listen_engine_event监听同一个事件；
+以及每个玩家一个监听器时，回调中按playerId过滤 与 使用key/value按值索引；
+以及大厅（root_state）和竞技场同时监听竞技场玩家的事件（两者都应收到）
+"""
+from common import measure, make_part, noop, ChainState
+from ..state.GamingState import GamingState
+
+DEPTH = 32
+PLAYER_COUNT = 100
+
+
+class ListeningChainState(ChainState):
+    def __init__(self, parent, depth):
+        ChainState.__init__(self, parent, 1, 0)
+        self.listen_engine_event('BenchEvent', noop)
+        if depth > 1:
+            self.add_sub_state('child', ListeningChainState, depth - 1)
+
+
+class PlayerListenersState(GamingState):
+    """
+    每个玩家一个监听器，keyed为False时在回调中过滤
+    """
+    def __init__(self, parent, keyed):
+        GamingState.__init__(self, parent)
+        for i in range(PLAYER_COUNT):
+            player_id = 'player-{}'.format(i)
+            if keyed:
+                self.listen_engine_event('BenchEvent', noop, key='playerId', value=player_id)
+            else:
+                self.listen_engine_event('BenchEvent', self._filtered(player_id))
+
+    @staticmethod
+    def _filtered(player_id):
+        def on_event(args):
+            if args['playerId'] != player_id:
+                return
+        return on_event
+
+
+def run(number=20000):
+    part = make_part()
+    part.root_state.add_sub_state('chain', ListeningChainState, DEPTH)
+    part.root_state.next_sub_state()
+    args = {'playerId': 'player-0'}
+
+    def fire():
+        part.fire_event('Minecraft', 'Engine', 'BenchEvent', args)
+    events_per_s = measure(fire, number)
+    results = {
+        'events_per_s': events_per_s,
+        'handler_calls_per_s': events_per_s * DEPTH,
+    }
+
+    for name, keyed in (('filtered', False), ('keyed', True)):
+        part = make_part()
+        part.root_state.add_sub_state('players', PlayerListenersState, keyed)
+        part.root_state.next_sub_state()
+
+        def fire_player():
+            part.fire_event('Minecraft', 'Engine', 'BenchEvent', args)
+        results['events_{}_{}_players_per_s'.format(name, PLAYER_COUNT)] = measure(fire_player, number // 10)
+
+    part = make_part()
+    calls = []
+    part.root_state.listen_engine_event('BenchEvent', calls.append)
+    arena = part.add_arena('arena-0')
+    arena.listen_engine_event('BenchEvent', calls.append)
+    part.join_arena('player-0', 'arena-0')
+
+    def fire_member():
+        part.fire_event('Minecraft', 'Engine', 'BenchEvent', args)
+    fire_member()
+    if len(calls) != 2:
+        raise AssertionError("大厅与竞技场的监听器应各收到一次: {}".format(len(calls)))
+    results['events_root_and_arena_per_s'] = measure(fire_member, number)
+    return results
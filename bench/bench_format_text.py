@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+format_text 与逐个替换实现（format_text_legacy）的性能对比
+"""
+import timeit
+
+from ..util.BetterPartUtil import BetterPartUtil
+
+MESSAGES = [
+    ("{gold}游戏将在 {yellow}{seconds} {gold}秒后开始", {'seconds': 10}),
+    ("{red}{bold}{name} {reset}{gray}被 {red}{killer} {gray}击杀了", {'name': 'Steve', 'killer': u'玩家'}),
+    ("{green}剩余时间: {white}{time}{enter}{aqua}存活玩家: {white}{alive}/{total}", {'time': '04:59', 'alive': 12, 'total': 16}),
+    ("{dark-gray}[{gray}大厅{dark-gray}] {white}等待玩家加入...", {}),
+]
+
+
+def run(number=20000):
+    results = {}
+    for name, func in (('format_text_legacy', BetterPartUtil.format_text_legacy), ('format_text', BetterPartUtil.format_text)):
+        def loop():
+            for raw_msg, args in MESSAGES:
+                func(raw_msg, **args)
+        results[name] = timeit.timeit(loop, number=number)
+    for raw_msg, args in MESSAGES:
+        assert BetterPartUtil.format_text(raw_msg, **args) == BetterPartUtil.format_text_legacy(raw_msg, **args)
+    calls = number * len(MESSAGES)
+    return {
+        'format_text_legacy_calls_per_s': calls / results['format_text_legacy'],
+        'format_text_calls_per_s': calls / results['format_text'],
+    }
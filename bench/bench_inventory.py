@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+开局发放物品套装：逐个格子发放 与 InventoryKit一次发送差异
+"""
+from common import measure, make_part
+from ..util.InventoryKit import InventoryKit
+from ..util.ComponentCache import COMP_ITEM
+from mod.common.minecraftEnum import ItemPosType
+
+PLAYER_COUNT = 100
+KIT_SIZE = 12
+
+
+def make_kit():
+    kit = InventoryKit()
+    for slot in range(KIT_SIZE):
+        kit.set_item(ItemPosType.INVENTORY, slot, {'newItemName': 'minecraft:stone', 'newAuxValue': 0, 'count': slot + 1})
+    return kit
+
+
+def give_item_by_item(part, kit, player_ids):
+    for player_id in player_ids:
+        player = part.get_better_player_obj(player_id)
+        player.clear_inventory()
+        comp = part.component_cache.get(COMP_ITEM, player_id)
+        for key, item_dict in kit.items.items():
+            comp.SetPlayerAllItems({key: item_dict})
+
+
+def run(number=50):
+    part = make_part(PLAYER_COUNT)
+    player_ids = part.GetLoadedPlayers()
+    kit = make_kit()
+    return {
+        'kit_item_by_item_{}_per_s'.format(PLAYER_COUNT): measure(lambda: give_item_by_item(part, kit, player_ids), number),
+        'kit_apply_{}_per_s'.format(PLAYER_COUNT): measure(lambda: part.apply_inventory_kit(kit, player_ids), number),
+    }
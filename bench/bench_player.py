@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+BetterPlayerObject 的构造与获取性能、客户端声音的合并发送，以及每个tick刷新倒计时ActionBar
+"""
+from Preset.Model.PartBase import engine_calls
+from common import measure, make_part
+from ..state.TimedGamingState import TimedGamingState
+from ..util.BetterPlayerObject import BetterPlayerObject
+from ..util.FrameClock import CLOCK_TICKS
+from ..util.PlayerHud import HUD_ACTIONBAR
+
+PLAYER_COUNT = 100
+SOUNDS_PER_TICK = 5
+COUNTDOWN_SECONDS = 600
+TICKS_PER_SECOND = 20
+
+
+def play_sounds_tick(part, players):
+    # 每个玩家一个tick内播放SOUNDS_PER_TICK个声音
+    for player in players:
+        for key in range(SOUNDS_PER_TICK):
+            player.play_client_sound("note.pling", (0, 0, 0), 1, BetterPlayerObject.get_note_sound_pitch(key), delay=key * 0.01)
+    part.TickServer()
+
+
+class CountdownState(TimedGamingState):
+    """
+    每个tick给所有玩家显示剩余时间
+    """
+    def __init__(self, parent, players, use_hud):
+        TimedGamingState.__init__(self, parent, COUNTDOWN_SECONDS)
+        self.extra = players
+        self.with_tick(self.show_hud if use_hud else self.show_action_bar)
+
+    def show_action_bar(self):
+        for player in self.extra:
+            player.send_action_bar(self.get_formatted_time_left())
+
+    def show_hud(self):
+        for player in self.extra:
+            player.update_hud(HUD_ACTIONBAR, self.get_formatted_time_left())
+
+
+def make_countdown_part(use_hud):
+    part = make_part(PLAYER_COUNT)
+    part.set_clock(CLOCK_TICKS)
+    part.root_state.add_sub_state('countdown', CountdownState, part.get_all_better_players(), use_hud)
+    part.root_state.next_sub_state()
+    return part
+
+
+def count_commands_per_second(part):
+    # 游戏中一秒（TICKS_PER_SECOND个tick）发送的命令数
+    before = engine_calls['SetCommand']
+    for _ in range(TICKS_PER_SECOND):
+        part.TickServer()
+    return engine_calls['SetCommand'] - before
+
+
+def run(number=2000):
+    part = make_part(PLAYER_COUNT)
+    player_obj = part.GetPlayerObject('player-0')
+    players = part.get_all_better_players()
+    return {
+        'client_sound_{}x{}_ticks_per_s'.format(PLAYER_COUNT, SOUNDS_PER_TICK): measure(lambda: play_sounds_tick(part, players), number // 20),
+        'better_player_construct_per_s': measure(lambda: BetterPlayerObject(part, player_obj), number * 50),
+        'get_better_player_obj_per_s': measure(lambda: part.get_better_player_obj('player-0'), number * 50),
+        'get_all_better_players_{}_per_s'.format(PLAYER_COUNT): measure(part.get_all_better_players, number),
+        'countdown_action_bar_{}_ticks_per_s'.format(PLAYER_COUNT): measure(make_countdown_part(False).TickServer, number // 20),
+        'countdown_hud_{}_ticks_per_s'.format(PLAYER_COUNT): measure(make_countdown_part(True).TickServer, number // 20),
+        'countdown_action_bar_{}_cmds_per_game_s'.format(PLAYER_COUNT): count_commands_per_second(make_countdown_part(False)),
+        'countdown_hud_{}_cmds_per_game_s'.format(PLAYER_COUNT): count_commands_per_second(make_countdown_part(True)),
+    }
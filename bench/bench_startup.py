@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时：InitServer中导入所有状态模块后add_sub_state 与 通过声明式状态树使用 "模块:类名" 引用（第一次进入时才导入）
+状态模块在临时目录中生成，每一轮都会从sys.modules中移除，模拟服务器刚启动时的导入
+"""
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+from common import measure, make_part
+
+MODE_COUNT = 40
+METHODS_PER_STATE = 60
+PACKAGE = 'bench_startup_modes'
+
+MODULE_TEMPLATE = '''# -*- coding: utf-8 -*-
+from GamingState.state.GamingState import GamingState
+
+TABLE = dict((i, str(i) * 4) for i in range(200))
+
+
+class ModeState(GamingState):
+    def __init__(self, parent):
+        GamingState.__init__(self, parent)
+        self.with_enter(self.method_0)
+
+{methods}
+'''
+
+METHOD_TEMPLATE = '''    def method_{index}(self):
+        return TABLE.get({index}, '{index}') + '{index}'
+'''
+
+
+def write_modules(directory):
+    package_dir = os.path.join(directory, PACKAGE)
+    os.mkdir(package_dir)
+    with open(os.path.join(package_dir, '__init__.py'), 'w') as f:
+        f.write('')
+    methods = ''.join(METHOD_TEMPLATE.format(index=index) for index in range(METHODS_PER_STATE))
+    for mode in range(MODE_COUNT):
+        with open(os.path.join(package_dir, 'mode{}.py'.format(mode)), 'w') as f:
+            f.write(MODULE_TEMPLATE.format(methods=methods))
+
+
+def forget_modules():
+    for name in list(sys.modules):
+        if name == PACKAGE or name.startswith(PACKAGE + '.'):
+            del sys.modules[name]
+
+
+def start_eager():
+    forget_modules()
+    part = make_part()
+    for mode in range(MODE_COUNT):
+        module = importlib.import_module('{}.mode{}'.format(PACKAGE, mode))
+        part.root_state.add_sub_state('mode{}'.format(mode), module.ModeState)
+    part.root_state.next_sub_state()
+
+
+def start_lazy():
+    forget_modules()
+    part = make_part()
+    part.build_state_tree({'states': [
+        {'name': 'mode{}'.format(mode), 'class': '{}.mode{}:ModeState'.format(PACKAGE, mode)} for mode in range(MODE_COUNT)
+    ]})
+    part.root_state.next_sub_state()
+
+
+def run(number=10):
+    directory = tempfile.mkdtemp()
+    sys.path.insert(0, directory)
+    try:
+        write_modules(directory)
+        # 先编译一次，两种方式都从.pyc导入
+        start_eager()
+        return {
+            'startup_eager_{}_modes_per_s'.format(MODE_COUNT): measure(start_eager, number),
+            'startup_lazy_{}_modes_per_s'.format(MODE_COUNT): measure(start_lazy, number),
+        }
+    finally:
+        forget_modules()
+        sys.path.remove(directory)
+        shutil.rmtree(directory)
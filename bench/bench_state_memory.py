@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+10k个状态对象的内存占用
+"""
+import gc
+import sys
+import types
+
+from ..state.GamingState import GamingState
+from ..state.TimedGamingState import TimedGamingState
+
+STATE_COUNT = 10000
+
+
+def deep_sizeof(obj, seen):
+    """
+    统计对象本身以及它持有的容器的大小，共享的对象（例如空容器）只统计一次
+    函数、类等不属于状态本身的对象不统计
+    """
+    if id(obj) in seen or isinstance(obj, (types.FunctionType, type, types.ModuleType, str, unicode, int, float, bool)) or obj is None:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, types.MethodType):
+        size += deep_sizeof(obj.__self__, seen)
+    else:
+        for klass in type(obj).__mro__:
+            for slot in klass.__dict__.get('__slots__', ()):
+                if hasattr(obj, slot):
+                    size += deep_sizeof(getattr(obj, slot), seen)
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(obj.__dict__, seen)
+    return size
+
+
+def _noop(*args):
+    pass
+
+
+def build_states(kind):
+    states = list()
+    for _ in range(STATE_COUNT):
+        if kind == 'empty':
+            states.append(GamingState(None))
+        elif kind == 'tick':
+            state = GamingState(None)
+            state.with_tick(_noop)
+            states.append(state)
+        elif kind == 'timed':
+            state = TimedGamingState(None, 10)
+            state.with_time_out(_noop)
+            states.append(state)
+    return states
+
+
+def run():
+    results = {}
+    for kind in ('empty', 'tick', 'timed'):
+        gc.collect()
+        states = build_states(kind)
+        seen = set()
+        total = sum(deep_sizeof(state, seen) for state in states)
+        results['{}_bytes_per_state'.format(kind)] = float(total) / STATE_COUNT
+    return results
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+状态树的tick性能：深的状态树（链状）、宽的状态树（大量子状态）、带间隔的tick回调、计时状态，
+以及按顺序执行的流程（每个tick轮询阶段 与 协程状态等待）
+"""
+from common import measure, make_part, noop, ChainState, WideState
+from ..state.GamingState import GamingState
+from ..state.TimedGamingState import TimedGamingState
+from ..state.CoroutineGamingState import CoroutineGamingState
+from ..util.FrameClock import CLOCK_TICKS
+
+DEEP_DEPTH = 64
+WIDE_WIDTH = 1000
+WIDE_TICK_CALLBACKS = 8
+INTERVAL_CALLBACKS = 100
+INTERVAL_TICKS = 20
+ARENA_COUNT = 50
+ARENA_DEPTH = 4
+# 计时状态的持续时间（秒），按tick数计时，不需要真实等待
+TIMED_DURATION = 1.0
+# 流程中每个阶段的等待时间（秒），测量期间一直处于等待中
+FLOW_STEPS = (5, 60, 30)
+
+
+class IntervalState(GamingState):
+    def __init__(self, parent, count, interval):
+        GamingState.__init__(self, parent)
+        for _ in range(count):
+            self.with_tick(noop, interval=interval)
+
+
+class CountdownState(TimedGamingState):
+    def __init__(self, parent):
+        TimedGamingState.__init__(self, parent, TIMED_DURATION)
+        self.with_tick(self.get_formatted_time_left)
+
+
+class PollingFlowState(GamingState):
+    """
+    每个tick检查当前阶段的等待是否结束
+    """
+    def __init__(self, parent):
+        GamingState.__init__(self, parent)
+        self.extra = [0, None]
+        self.with_tick(self.poll)
+
+    def poll(self):
+        step, deadline = self.extra
+        now = self.get_root_state().get_time()
+        if deadline is None:
+            self.extra[1] = now + FLOW_STEPS[step]
+        elif now >= deadline and step + 1 < len(FLOW_STEPS):
+            self.extra[0] = step + 1
+            self.extra[1] = now + FLOW_STEPS[step + 1]
+
+
+class CoroutineFlowState(CoroutineGamingState):
+    """
+    同样的流程，等待期间不占用tick
+    """
+    def run(self):
+        for seconds in FLOW_STEPS:
+            yield seconds
+
+
+def run(number=5000):
+    results = {}
+
+    part = make_part()
+    part.root_state.add_sub_state('deep', ChainState, DEEP_DEPTH)
+    part.root_state.next_sub_state()
+    results['tick_deep{}_per_s'.format(DEEP_DEPTH)] = measure(part.TickServer, number)
+
+    part = make_part()
+    part.root_state.add_sub_state('wide', WideState, WIDE_WIDTH, WIDE_TICK_CALLBACKS)
+    part.root_state.next_sub_state()
+    results['tick_wide{}_per_s'.format(WIDE_WIDTH)] = measure(part.TickServer, number)
+
+    # 同样数量的回调，每个tick都执行 与 每INTERVAL_TICKS个tick执行一次
+    for interval in (1, INTERVAL_TICKS):
+        part = make_part()
+        part.root_state.add_sub_state('interval', IntervalState, INTERVAL_CALLBACKS, interval)
+        part.root_state.next_sub_state()
+        results['tick_{}x_interval{}_per_s'.format(INTERVAL_CALLBACKS, interval)] = measure(part.TickServer, number)
+
+    # 同一零件中的多个竞技场
+    part = make_part()
+    for i in range(ARENA_COUNT):
+        arena = part.add_arena('arena-{}'.format(i))
+        arena.add_sub_state('game', ChainState, ARENA_DEPTH)
+        arena.next_sub_state()
+    results['tick_arenas{}_per_s'.format(ARENA_COUNT)] = measure(part.TickServer, number // 10)
+
+    # 每个竞技场一个循环的倒计时状态，每个tick读取剩余时间
+    part = make_part()
+    part.set_clock(CLOCK_TICKS)
+    for i in range(ARENA_COUNT):
+        arena = part.add_arena('arena-{}'.format(i))
+        arena.set_loop()
+        arena.add_sub_state('countdown', CountdownState)
+        arena.next_sub_state()
+    results['tick_timed_arenas{}_per_s'.format(ARENA_COUNT)] = measure(part.TickServer, number // 10)
+
+    # 每个竞技场一个等待中的流程
+    for name, state_class in (('polling', PollingFlowState), ('coroutine', CoroutineFlowState)):
+        part = make_part()
+        part.set_clock(CLOCK_TICKS)
+        for i in range(ARENA_COUNT):
+            arena = part.add_arena('arena-{}'.format(i))
+            arena.add_sub_state('flow', state_class)
+            arena.next_sub_state()
+        results['tick_{}_flow_arenas{}_per_s'.format(name, ARENA_COUNT)] = measure(part.TickServer, number // 10)
+    return results
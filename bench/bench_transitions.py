@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+状态切换性能：next_sub_state 与 toggle_sub_state，以及tick中多次切换时的立即切换与延迟切换
+"""
+from common import measure, make_part, WideState
+
+WIDTH = 1000
+# 每个tick中连续调用next_sub_state的次数
+NEXT_PER_TICK = 3
+
+
+def run(number=20000):
+    results = {}
+
+    part = make_part()
+    part.root_state.add_sub_state('wide', WideState, WIDTH)
+    part.root_state.next_sub_state()
+    wide = part.root_state.current_sub_state
+    wide.set_loop()
+    results['next_sub_state_per_s'] = measure(wide.next_sub_state, number)
+
+    names = ['s0', 's{}'.format(WIDTH - 1)]
+    counter = [0]
+
+    def toggle():
+        counter[0] += 1
+        wide.toggle_sub_state(names[counter[0] & 1])
+    results['toggle_sub_state_per_s'] = measure(toggle, number)
+
+    for deferred in (False, True):
+        part = make_part()
+        part.root_state.add_sub_state('wide', WideState, WIDTH)
+        part.root_state.next_sub_state()
+        wide = part.root_state.current_sub_state
+        wide.set_loop()
+        part.enable_deferred_transitions(deferred)
+
+        def next_several():
+            for _ in range(NEXT_PER_TICK):
+                wide.next_sub_state()
+        wide.with_tick(next_several)
+        results['tick_next_x{}_{}_per_s'.format(NEXT_PER_TICK, 'deferred' if deferred else 'immediate')] = measure(part.TickServer, number // 4)
+    return results
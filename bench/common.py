@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试的公共方法
+"""
+import time
+
+from ..GamingStatePart import GamingStatePart
+from ..state.GamingState import GamingState
+
+
+def measure(func, number, repeat=5):
+    """
+    @description 执行func number次，重复repeat轮，取最快的一轮
+    :return: 每秒执行次数
+    :rtype: float
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return number / best if best > 0 else float('inf')
+
+
+def make_part(player_count=0):
+    """
+    @description 创建一个已经InitServer的零件（需要引擎或bench/standin替身）
+    :rtype: GamingStatePart
+    """
+    part = GamingStatePart()
+    part.InitServer()
+    for i in range(player_count):
+        part.add_player("player-{}".format(i))
+    return part
+
+
+def noop(*args):
+    pass
+
+
+class ChainState(GamingState):
+    """
+    每层只有一个子状态的链状结构，用于测试深的状态树
+    """
+    def __init__(self, parent, depth, tick_callbacks=1):
+        GamingState.__init__(self, parent)
+        for _ in range(tick_callbacks):
+            self.with_tick(noop)
+        if depth > 1:
+            self.add_sub_state('child', ChainState, depth - 1, tick_callbacks)
+
+
+class WideState(GamingState):
+    """
+    有大量子状态的结构，用于测试宽的状态树
+    """
+    def __init__(self, parent, width, tick_callbacks=1):
+        GamingState.__init__(self, parent)
+        for _ in range(tick_callbacks):
+            self.with_tick(noop)
+        for i in range(width):
+            self.add_sub_state('s{}'.format(i), LeafState, tick_callbacks)
+
+
+class LeafState(GamingState):
+    def __init__(self, parent, tick_callbacks=1):
+        GamingState.__init__(self, parent)
+        for _ in range(tick_callbacks):
+            self.with_tick(noop)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试入口，使用 bench/standin 中的引擎替身，在普通的 Python 2.7 环境中运行
+用法（在零件目录中）：
+    python bench/run.py                        运行全部基准
+    python bench/run.py tick events            只运行指定的基准
+    python bench/run.py --output new.json      保存结果，便于在不同提交之间对比
+    python bench/run.py --compare old.json     与之前保存的结果对比
+"""
+import argparse
+import imp
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCH_DIR)
+# 零件在MCStudio中的目录名，零件内部使用相对导入，需要以包的形式导入
+PACKAGE_NAME = 'GamingState'
+
+BENCHMARKS = ['tick', 'transitions', 'events', 'format_text', 'player', 'inventory', 'state_memory', 'startup']
+
+
+def setup():
+    """
+    @description 把引擎替身加入sys.path，并把零件目录注册为GamingState包
+    """
+    standin_dir = os.path.join(BENCH_DIR, 'standin')
+    if standin_dir not in sys.path:
+        sys.path.insert(0, standin_dir)
+    if PACKAGE_NAME not in sys.modules:
+        package = imp.new_module(PACKAGE_NAME)
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules[PACKAGE_NAME] = package
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PACKAGE_DIR).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names):
+    results = {}
+    for name in names:
+        module = importlib.import_module('{}.bench.bench_{}'.format(PACKAGE_NAME, name))
+        results[name] = module.run()
+        for metric, value in sorted(results[name].items()):
+            print("{:<14} {:<36} {:>16.1f}".format(name, metric, value))
+    return results
+
+
+def compare(results, previous):
+    print("")
+    print("{:<14} {:<36} {:>16} {:>16} {:>9}".format('benchmark', 'metric', 'previous', 'current', 'change'))
+    for name, metrics in sorted(results.items()):
+        previous_metrics = previous.get('results', {}).get(name, {})
+        for metric, value in sorted(metrics.items()):
+            previous_value = previous_metrics.get(metric)
+            if previous_value is None:
+                print("{:<14} {:<36} {:>16} {:>16.1f} {:>9}".format(name, metric, '-', value, '-'))
+            else:
+                change = (value - previous_value) / previous_value * 100.0 if previous_value else 0.0
+                print("{:<14} {:<36} {:>16.1f} {:>16.1f} {:>+8.1f}%".format(name, metric, previous_value, value, change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GamingState 基准测试")
+    parser.add_argument('benchmarks', nargs='*', help="要运行的基准，默认全部：" + ", ".join(BENCHMARKS))
+    parser.add_argument('--output', help="结果保存路径（JSON）")
+    parser.add_argument('--compare', help="与之前保存的结果对比（JSON）")
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("未知的基准: {}".format(name))
+
+    setup()
+    results = run_benchmarks(args.benchmarks or BENCHMARKS)
+    report = {
+        'commit': get_commit(),
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return report
+
+
+if __name__ == '__main__':
+    main()
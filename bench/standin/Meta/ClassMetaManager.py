@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+
+def sunshine_class_meta(cls):
+    return cls
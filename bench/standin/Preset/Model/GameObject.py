@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+
+def registerGenericClass(class_name):
+    def decorator(cls):
+        return cls
+    return decorator
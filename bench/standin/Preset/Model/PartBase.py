@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+MCStudio 引擎 PartBase 的本地替身，只实现了本零件用到的接口，仅用于 bench/run.py
+所有引擎调用都会计入 engine_calls，便于基准测试统计调用次数
+"""
+from collections import defaultdict
+
+# 引擎接口名称 -> 调用次数
+engine_calls = defaultdict(int)
+
+
+def reset_engine_calls():
+    engine_calls.clear()
+
+
+class StandInComponent(object):
+    """
+    引擎组件的替身，记录调用次数；带返回值的接口在这里单独实现
+    """
+    def __init__(self, component_type, entity_id=None):
+        self.component_type = component_type
+        self.entity_id = entity_id
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            engine_calls[self.component_type + '.' + name] += 1
+        return call
+
+    def GetPlayerAllItems(self, pos_type, *args):
+        engine_calls[self.component_type + '.GetPlayerAllItems'] += 1
+        from mod.common.minecraftEnum import ItemPosType
+        return [None] * (4 if pos_type == ItemPosType.ARMOR else 36)
+
+
+class StandInEngineCompFactory(object):
+    def __getattr__(self, name):
+        if not name.startswith('Create'):
+            raise AttributeError(name)
+
+        def create(entity_id=None, *args):
+            engine_calls['EngineCompFactory.' + name] += 1
+            return StandInComponent(name[len('Create'):], entity_id)
+        return create
+
+
+class StandInApi(object):
+    def __init__(self):
+        self.comp_factory = StandInEngineCompFactory()
+
+    def GetEngineCompFactory(self):
+        return self.comp_factory
+
+
+class SdkInterface(object):
+    """
+    PartBase与PlayerObject共用的接口
+    """
+    isClient = False
+
+    def LogDebug(self, msg):
+        pass
+
+    def LogInfo(self, msg):
+        pass
+
+    def LogError(self, msg):
+        print("[ERROR] " + str(msg))
+
+    def GetApi(self):
+        return _api
+
+    def GetLevelId(self):
+        return '-1'
+
+    def SetCommand(self, cmd_str, player_id=None, show_output=False):
+        engine_calls['SetCommand'] += 1
+        return True
+
+    def CreateGameComponent(self):
+        engine_calls['CreateGameComponent'] += 1
+        return StandInComponent('Game')
+
+    def CreateItemComponent(self, entity_id):
+        engine_calls['CreateItemComponent'] += 1
+        return StandInComponent('Item', entity_id)
+
+    def NotifyToClient(self, player_id, event_name, event_data):
+        engine_calls['NotifyToClient'] += 1
+
+
+class PartBase(SdkInterface):
+    """
+    零件基类的替身
+    事件监听保存在listeners中，通过fire_event/fire_self_event模拟引擎派发事件
+    """
+    def __init__(self):
+        self.listeners = defaultdict(list)  # type: dict[tuple, list[callable]]
+        self.loaded_players = list()  # type: list[str]
+        self.player_objects = {}
+
+    def InitClient(self):
+        pass
+
+    def InitServer(self):
+        pass
+
+    def TickClient(self):
+        pass
+
+    def TickServer(self):
+        pass
+
+    def DestroyClient(self):
+        pass
+
+    def DestroyServer(self):
+        pass
+
+    # 事件
+
+    def ListenForEvent(self, namespace, system_name, event_name, instance, func):
+        engine_calls['ListenForEvent'] += 1
+        self.listeners[(namespace, system_name, event_name)].append(func)
+
+    def UnListenForEvent(self, namespace, system_name, event_name, instance, func):
+        engine_calls['UnListenForEvent'] += 1
+        self.listeners[(namespace, system_name, event_name)].remove(func)
+
+    def ListenForEngineEvent(self, event_name, instance, func):
+        self.ListenForEvent('Minecraft', 'Engine', event_name, instance, func)
+
+    def ListenSelfEvent(self, event_name, instance, func):
+        engine_calls['ListenSelfEvent'] += 1
+        self.listeners[(None, None, event_name)].append(func)
+
+    def UnListenSelfEvent(self, event_name, instance, func):
+        engine_calls['UnListenSelfEvent'] += 1
+        self.listeners[(None, None, event_name)].remove(func)
+
+    def fire_event(self, namespace, system_name, event_name, args):
+        """
+        @description 替身专用：模拟引擎派发事件
+        """
+        for func in list(self.listeners.get((namespace, system_name, event_name), ())):
+            func(args)
+
+    def fire_self_event(self, event_name, args):
+        """
+        @description 替身专用：模拟派发零件自身的事件
+        """
+        self.fire_event(None, None, event_name, args)
+
+    # 玩家
+
+    def add_player(self, player_id):
+        """
+        @description 替身专用：模拟玩家加入
+        """
+        from Preset.Model.Player.PlayerObject import PlayerObject
+        self.loaded_players.append(player_id)
+        self.player_objects[player_id] = PlayerObject(player_id)
+        self.fire_event('Minecraft', 'Engine', 'AddServerPlayerEvent', {'id': player_id})
+
+    def remove_player(self, player_id):
+        """
+        @description 替身专用：模拟玩家离开
+        """
+        self.loaded_players.remove(player_id)
+        self.player_objects.pop(player_id, None)
+        self.fire_event('Minecraft', 'Engine', 'DelServerPlayerEvent', {'id': player_id})
+
+    def GetLoadedPlayers(self):
+        return list(self.loaded_players)
+
+    def GetPlayerObject(self, player_id):
+        return self.player_objects.get(player_id)
+
+    def GetLocalPlayerId(self):
+        return self.loaded_players[0] if self.loaded_players else None
+
+
+_api = StandInApi()
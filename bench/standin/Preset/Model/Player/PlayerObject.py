@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+MCStudio 引擎 PlayerObject 的本地替身，仅用于 bench/run.py
+"""
+from Preset.Model.PartBase import SdkInterface, engine_calls
+
+
+class PlayerObject(SdkInterface):
+
+    def __init__(self, player_id=None):
+        self.playerId = player_id
+        self.pos = (0.0, 64.0, 0.0)
+        self.rot = (0.0, 0.0)
+        self.dimensionId = 0
+
+    def GetPlayerId(self):
+        return self.playerId
+
+    def GetPos(self):
+        return self.pos
+
+    def SetPos(self, pos):
+        engine_calls['SetPos'] += 1
+        self.pos = pos
+
+    def GetRot(self):
+        return self.rot
+
+    def SetRot(self, rot):
+        engine_calls['SetRot'] += 1
+        self.rot = rot
+
+    def GetDimensionId(self):
+        return self.dimensionId
+
+    def ChangeDimension(self, dimension, pos):
+        engine_calls['ChangeDimension'] += 1
+        self.dimensionId = dimension
+        self.pos = pos
+
+    def NotifyOneMessage(self, player_id, message, color):
+        engine_calls['NotifyOneMessage'] += 1
+
+    def SetOneTipMessage(self, player_id, tip):
+        engine_calls['SetOneTipMessage'] += 1
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+
+class PartBaseMeta(object):
+    CLASS_NAME = "PartBase"
+    PROPERTIES = {}
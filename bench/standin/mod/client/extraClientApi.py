@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+from Preset.Model.PartBase import StandInEngineCompFactory
+
+_comp_factory = StandInEngineCompFactory()
+
+
+def GetEngineCompFactory():
+    return _comp_factory
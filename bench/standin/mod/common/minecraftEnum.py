@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+
+class ItemPosType(object):
+    INVENTORY = 0
+    OFFHAND = 1
+    CARRIED = 2
+    ARMOR = 3
+
+
+class PlayerUISlot(object):
+    CursorSelected = 0
+    Crafting2x2Input1 = 28
+    Crafting2x2Input2 = 29
+    Crafting2x2Input3 = 30
+    Crafting2x2Input4 = 31
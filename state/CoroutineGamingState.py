@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+import types
+
+from GamingState import GamingState, EventCallback, EventListenContext
+from ..util.FlightRecorder import KIND_TOGGLE
+
+
+class WaitTicks(object):
+    """
+    等待指定的tick数
+    """
+    __slots__ = ('ticks',)
+
+    def __init__(self, ticks):
+        self.ticks = ticks  # type: int
+
+
+class WaitEvent(object):
+    """
+    等待一个事件，事件参数作为yield的结果
+    """
+    __slots__ = ('namespace', 'system_name', 'event_name', 'predicate', 'key', 'value')
+
+    def __init__(self, namespace, system_name, event_name, predicate, key=None, value=None):
+        self.namespace = namespace  # type: str | None
+        self.system_name = system_name  # type: str | None
+        self.event_name = event_name  # type: str
+        self.predicate = predicate  # type: callable | None
+        self.key = key  # type: str | None
+        self.value = value
+
+
+class WaitChild(object):
+    """
+    进入一个子状态，并等待它结束（子状态调用父状态的next_sub_state时，例如TimedGamingState超时）
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name  # type: str
+
+
+def wait_seconds(seconds):
+    """
+    @description 等待一段时间（也可以直接 yield 秒数）
+    :type seconds: float
+    """
+    return seconds
+
+
+def wait_ticks(ticks):
+    """
+    @description 等待指定的tick数（yield None 等待一个tick）
+    :type ticks: int
+    """
+    return WaitTicks(ticks)
+
+
+def wait_event(event_name, namespace="Minecraft", system_name="Engine", predicate=None, key=None, value=None):
+    """
+    @description 等待一个事件（默认为引擎事件），yield的结果为事件参数
+    :param event_name: 事件名称
+    :type event_name: str
+    :param predicate: 过滤条件 predicate(args)，返回True时才继续
+    :type predicate: callable | None
+    :param key: 只等待 args[key] == value 的事件（按值索引，见GamingState.listen_event）
+    :type key: str | None
+    """
+    return WaitEvent(namespace, system_name, event_name, predicate, key, value)
+
+
+def wait_self_event(event_name, predicate=None, key=None, value=None):
+    """
+    @description 等待一个来自自己零件的事件，yield的结果为事件参数
+    :type event_name: str
+    :type predicate: callable | None
+    :type key: str | None
+    """
+    return WaitEvent(None, None, event_name, predicate, key, value)
+
+
+def wait_child(name):
+    """
+    @description 进入子状态并等待它结束
+    :param name: 子状态名称
+    :type name: str
+    """
+    return WaitChild(name)
+
+
+class CoroutineGamingState(GamingState):
+    """
+    逻辑是一个生成器的状态，适合 "冻结5秒、放下玩家、等待60秒、刷新箱子" 这样按顺序执行的流程：
+        def run(self):
+            self.freeze_players()
+            yield 5
+            self.drop_players()
+            yield wait_event('PlayerDieEvent')
+            yield wait_child('fight')
+    进入状态时开始执行，yield的等待条件满足时由根状态的定时器或事件恢复执行，等待中不占用每个tick的开销；
+    生成器执行完毕时切换到父状态的下一个子状态，退出状态时关闭生成器（执行其中的finally）
+    子状态不会在进入时自动进入，只通过wait_child进入
+    """
+    __slots__ = ('coroutine_function', 'coroutine', 'wait_listener', 'wait_predicate', 'waiting_child')
+
+    def __init__(self, parent, coroutine_function=None):
+        """
+        :param coroutine_function: 返回生成器的函数 coroutine_function(state)，为None时使用run()
+        :type coroutine_function: callable | None
+        """
+        GamingState.__init__(self, parent)
+        self.coroutine_function = coroutine_function  # type: callable | None
+        self.coroutine = None  # type: types.GeneratorType | None
+        # 正在等待的事件监听
+        self.wait_listener = None  # type: EventListenContext | None
+        self.wait_predicate = None  # type: callable | None
+        # 正在等待结束的子状态名称
+        self.waiting_child = None  # type: str | None
+        self.with_enter(self._coroutine_on_enter)
+        self.with_exit(self._coroutine_on_exit)
+
+    def run(self):
+        """
+        @description 状态的流程（子类override为生成器）
+        """
+        return
+        yield
+
+    def _enter_default_child(self):
+        # 子状态由wait_child进入，不自动进入第一个子状态
+        pass
+
+    def reset(self):
+        """
+        @description 复用实例前清理协程（子类override时需要调用CoroutineGamingState.reset(self)）
+        """
+        self.coroutine = None
+        self.wait_listener = None
+        self.wait_predicate = None
+        self.waiting_child = None
+
+    def _coroutine_on_enter(self):
+        if self.coroutine_function is not None:
+            self.coroutine = self.coroutine_function(self)
+        else:
+            self.coroutine = self.run()
+        if not isinstance(self.coroutine, types.GeneratorType):
+            self.coroutine = None
+            return
+        self._resume(None)
+
+    def _coroutine_on_exit(self):
+        self._stop_waiting()
+        coroutine = self.coroutine
+        if coroutine is not None:
+            self.coroutine = None
+            if coroutine.gi_running:
+                # 生成器自己切换了状态（例如在yield之间调用了parent.next_sub_state()），
+                # 正在执行中的生成器不能关闭，由_resume在send返回后关闭
+                return
+            self._close_coroutine(coroutine)
+
+    def _close_coroutine(self, coroutine):
+        try:
+            coroutine.close()
+        except Exception as e:
+            self._on_callback_error('coroutine', e)
+
+    def _resume(self, value):
+        self._stop_waiting()
+        coroutine = self.coroutine
+        if coroutine is None or not self.running:
+            return
+        try:
+            command = coroutine.send(value)
+        except StopIteration:
+            if self.coroutine is not coroutine:
+                # 最后一段中已经退出了本状态
+                return
+            self.coroutine = None
+            # 流程执行完毕，与TimedGamingState超时相同，切换到父状态的下一个子状态；
+            # 开启了延迟切换并且生成器已经请求了父状态的切换时，以它的请求为准（与立即切换时已经退出的情况一致）
+            queue = self.root.transition_queue
+            if self.parent is not None and (queue is None or not queue.has_pending(self.parent)):
+                self.parent.next_sub_state()
+            return
+        except Exception as e:
+            if self.coroutine is coroutine:
+                self.coroutine = None
+            self._on_callback_error('coroutine', e)
+            return
+        if self.coroutine is not coroutine or not self.running:
+            # 执行期间退出了本状态：不再等待，现在关闭生成器（执行其中的finally）
+            if self.coroutine is coroutine:
+                self.coroutine = None
+            self._close_coroutine(coroutine)
+            return
+        self._wait(command)
+
+    def _wait(self, command):
+        if command is None:
+            self.get_root_state().schedule_ticks(1, self._resume_later, self)
+        elif isinstance(command, (int, long, float)) and not isinstance(command, bool):
+            self.schedule_after(command, self._resume_later)
+        elif isinstance(command, WaitTicks):
+            self.get_root_state().schedule_ticks(command.ticks, self._resume_later, self)
+        elif isinstance(command, WaitEvent):
+            event_callback = EventCallback(self, self._on_wait_event)
+            self.wait_listener = EventListenContext(command.namespace, command.system_name, command.event_name, event_callback, event_callback.call, command.key, command.value)
+            self.wait_predicate = command.predicate
+            self.get_part().event_router.activate(self.wait_listener)
+        elif isinstance(command, WaitChild):
+            self.waiting_child = command.name
+            self.toggle_sub_state(command.name)
+        else:
+            coroutine = self.coroutine
+            self.coroutine = None
+            self._close_coroutine(coroutine)
+            self._on_callback_error('coroutine', TypeError("协程yield了无法等待的值: {!r}".format(command)))
+
+    def _resume_later(self):
+        self._resume(None)
+
+    def _on_wait_event(self, args):
+        if self.wait_listener is None or (self.wait_predicate is not None and not self.wait_predicate(args)):
+            return
+        self._resume(args)
+
+    def _stop_waiting(self):
+        if self.wait_listener is not None:
+            self.get_part().event_router.deactivate(self.wait_listener)
+            self.wait_listener = None
+            self.wait_predicate = None
+        self.waiting_child = None
+
+    def _finish_child(self):
+        # 等待的子状态结束：退出子状态，并恢复协程
+        previous_state_name = self.current_sub_state_name
+        if self.current_sub_state is not None:
+            self._exit_current_sub_state()
+            self._set_current_sub_state(None, None)
+            self._on_transition(KIND_TOGGLE, previous_state_name, None)
+        self._resume(None)
+
+    def _next_sub_state_now(self):
+        if self.waiting_child is not None:
+            self._finish_child()
+        else:
+            GamingState._next_sub_state_now(self)
+
+    def _apply_transition(self, kind, state_name):
+        if self.waiting_child is not None and kind != KIND_TOGGLE:
+            self._finish_child()
+        else:
+            GamingState._apply_transition(self, kind, state_name)
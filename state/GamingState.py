@@ -1,56 +1,134 @@
 # -*- coding: utf-8 -*-
 import traceback
-from collections import OrderedDict
+from OrderedSubStates import OrderedSubStates, EMPTY_SUB_STATES
+from StatePool import StatePool
+from LazyStateSupplier import LazyStateSupplier
+from TickSchedule import TickSchedule
 from ..GamingStatePart import GamingStatePart
+from ..util.FlightRecorder import KIND_NEXT, KIND_TOGGLE, KIND_LOOP, KIND_BUBBLE_UP, KIND_REMOVE
 
 
-class EventListenContext:
+class EmptyDict(dict):
+    """
+    共享的空dict（只读），读取、get、pop(key, default)与普通的空dict相同，写入时报错
+    """
+    __slots__ = ()
+
+    def __setitem__(self, key, value):
+        raise TypeError("EmptyDict is read-only")
+
+    def setdefault(self, key, default=None):
+        raise TypeError("EmptyDict is read-only")
+
+    def update(self, *args, **kwargs):
+        raise TypeError("EmptyDict is read-only")
+
+
+# 共享的空容器（只读），状态在第一次注册时才创建自己的list/dict，大部分状态只会用到其中一两个
+EMPTY = ()
+EMPTY_DICT = EmptyDict()
+
+
+def _bind_supplier(state_supplier, args, kwargs):
+    # "模块:类名" 的引用在第一次进入时才导入
+    if isinstance(state_supplier, basestring):
+        state_supplier = LazyStateSupplier(state_supplier)
+    return lambda parent: state_supplier(parent, *args, **kwargs)
+
+
+def _truncated(items, length):
+    # 截断到指定长度，截断为空时换回共享的空容器
+    if length == 0:
+        return EMPTY
+    del items[length:]
+    return items
+
+
+class EventListenContext(object):
     """
     用于存储需要监听的事件的上下文
-    在enter时监听，在exit时取消监听
+    在enter时加入零件的路由表，在exit时移出路由表
     """
-    def __init__(self, namespace, system_name, event_name, instance, func):
+    __slots__ = ('namespace', 'system_name', 'event_name', 'instance', 'func', 'key', 'value', 'arena_id', 'sequence')
+
+    def __init__(self, namespace, system_name, event_name, instance, func, key=None, value=None):
         self.namespace = namespace
         self.system_name = system_name
         self.event_name = event_name
         self.instance = instance
         self.func = func
+        # 只接收 args[key] == value 的事件，路由表按值建立索引；key为None时接收所有事件
+        self.key = key  # type: str | None
+        self.value = value
+        # 加入路由表时由EventRouter设置：所属竞技场，以及用于按加入顺序派发的序号
+        self.arena_id = None  # type: str | None
+        self.sequence = 0  # type: int
+
 
+class EventCallback(object):
+    __slots__ = ('state', 'callback')
 
-class EventCallback:
     def __init__(self, state, callback):
         self.state = state
         self.callback = callback
 
     def call(self, args):
         # 触发时，先判断状态是否还在运行
-        if self.state.is_state_running():
+        if self.state.running:
             self.callback(args)
 
 
-class GamingState:
+class GamingState(object):
+    """
+    状态机的状态（使用__slots__，回调列表等容器在第一次注册时才创建）
+    子类不声明__slots__时，会和普通对象一样拥有__dict__，可以随意添加属性；
+    子类如果也声明了__slots__来节省内存，可以使用扩展槽 extra 存放额外的数据
+    """
+    __slots__ = (
+        'parent', 'root', 'running', 'current_sub_state_name', 'current_sub_state', 'loop',
+        'listened_events', 'listened_self_events',
+        'sub_states', 'sub_state_pools', 'registration_marks',
+        'callbacks_init', 'callbacks_enter', 'callbacks_exit', 'callbacks_tick', 'callbacks_no_such_next_sub_state',
+        'tick_priorities', 'tick_schedule', 'scheduled_timers', 'extra',
+    )
 
     def __init__(self, parent):
         self.parent = parent  # type: GamingState | None
+        # 所属的根状态（父状态在构造时已经确定，不需要每次向上查找）
+        self.root = parent.get_root_state() if parent is not None else None  # type: RootGamingState | None
+        # 是否是父状态的当前子状态，由父状态切换子状态时维护
+        self.running = parent is None  # type: bool
         self.current_sub_state_name = None  # type: str | None
         self.current_sub_state = None  # type: GamingState | None
         self.loop = False  # type: bool
 
-        self.listened_events = list()  # type: list[EventListenContext]
-        self.listened_self_events = list()  # type: list[EventListenContext]
+        self.listened_events = EMPTY  # type: list[EventListenContext]
+        self.listened_self_events = EMPTY  # type: list[EventListenContext]
 
-        # 子状态机的工厂，是一个有序dict
-        self.sub_states = OrderedDict()  # type: dict[str, callable] # (id) -> state_supplier
+        # 子状态机的工厂，是一个有序dict，可以O(1)查找下一个子状态
+        self.sub_states = EMPTY_SUB_STATES  # type: OrderedSubStates # (id) -> state_supplier
+        # 开启了复用的子状态的实例池 (id) -> StatePool
+        self.sub_state_pools = EMPTY_DICT  # type: dict[str, StatePool]
+        # 实例化完成时各个回调列表的长度，复用时会截断到这个长度，去掉运行中追加的回调
+        self.registration_marks = None  # type: tuple | None
         # 状态初始化时的回调
-        self.callbacks_init = list()  # type: list[callable]
+        self.callbacks_init = EMPTY  # type: list[callable]
         # 状态开始时的回调
-        self.callbacks_enter = list()  # type: list[callable]
+        self.callbacks_enter = EMPTY  # type: list[callable]
         # 状态结束时的回调
-        self.callbacks_exit = list()  # type: list[callable]
-        # tick回调
-        self.callbacks_tick = list()  # type: list[callable]
+        self.callbacks_exit = EMPTY  # type: list[callable]
+        # 每个tick都执行的回调，按优先级从高到低排列
+        self.callbacks_tick = EMPTY  # type: list[callable]
+        # callbacks_tick对应的优先级，全部为默认优先级0时不创建
+        self.tick_priorities = EMPTY  # type: list[int]
+        # 间隔大于1个tick的回调，没有时为None
+        self.tick_schedule = None  # type: TickSchedule | None
         # 当没有下一个子状态时回调
-        self.callbacks_no_such_next_sub_state = list()  # type: list[callable]
+        self.callbacks_no_such_next_sub_state = EMPTY  # type: list[callable]
+        # 属于本状态的定时任务，退出时自动取消
+        self.scheduled_timers = EMPTY  # type: list
+        # 扩展槽，供声明了__slots__的子类存放额外数据
+        self.extra = None
 
     # ====== 生命周期方法（不要轻易override） ======
 
@@ -58,57 +136,53 @@ class GamingState:
         """
         @description 创建状态
         """
-        for callback in self.callbacks_init:
-            try:
-                callback()
-            except Exception as e:
-                self.get_part().LogError("GamingState.init callback error: " + str(e))
-                traceback.print_exc()
+        self._run_callbacks(self.callbacks_init, 'init')
 
     def enter(self):
         """
         @description 进入状态（不推荐override，而是调用with_enter）
         """
+        self._enter_self()
+        self._enter_default_child()
+
+    def _enter_default_child(self):
+        # 如果该状态机包含子状态，那么自动进入子状态（属于同一次切换，不会延迟）
+        if len(self.sub_states) > 0:
+            self._next_sub_state_now()
+
+    def _enter_self(self):
+        # 进入本状态，但不自动进入子状态（从快照恢复时由快照决定进入哪个子状态）
         # 监听器
-        for listener in self.listened_events:
-            self.get_part().ListenForEvent(
-                listener.namespace, listener.system_name, listener.event_name, listener.instance, listener.func
-            )
-        for listener in self.listened_self_events:
-            self.get_part().ListenSelfEvent(
-                listener.event_name, listener.instance, listener.func
-            )
+        if self.listened_events or self.listened_self_events:
+            router = self.get_part().event_router
+            for listener in self.listened_events:
+                router.activate(listener)
+            for listener in self.listened_self_events:
+                router.activate(listener)
+        # 间隔tick回调的相位从进入状态时开始计算
+        if self.tick_schedule is not None:
+            self.tick_schedule.tick_count = 0
         # 回调
-        for callback in self.callbacks_enter:
-            try:
-                callback()
-            except Exception as e:
-                self.get_part().LogError("GamingState.enter callback error: " + str(e))
-                traceback.print_exc()
-        # 如果该状态机包含子状态，那么自动进入子状态
-        if len(self.sub_states) > 0:
-            self.next_sub_state()
+        self._run_callbacks(self.callbacks_enter, 'enter')
 
     def exit(self):
         """
         @description 退出状态（不推荐override，而是调用with_exit）
         """
         # 监听器
-        for listener in self.listened_events:
-            self.get_part().UnListenForEvent(
-                listener.namespace, listener.system_name, listener.event_name, listener.instance, listener.func
-            )
-        for listener in self.listened_self_events:
-            self.get_part().UnListenSelfEvent(
-                listener.event_name, listener.instance, listener.func
-            )
+        if self.listened_events or self.listened_self_events:
+            router = self.get_part().event_router
+            for listener in self.listened_events:
+                router.deactivate(listener)
+            for listener in self.listened_self_events:
+                router.deactivate(listener)
         # 回调
-        for callback in self.callbacks_exit:
-            try:
-                callback()
-            except Exception as e:
-                self.get_part().LogError("GamingState.exit callback error: " + str(e))
-                traceback.print_exc()
+        self._run_callbacks(self.callbacks_exit, 'exit')
+        # 定时任务
+        if self.scheduled_timers:
+            for timer in self.scheduled_timers:
+                timer.cancelled = True
+            self.scheduled_timers = EMPTY
 
     def tick(self):
         """
@@ -119,12 +193,80 @@ class GamingState:
                 self.current_sub_state.tick()
             else:
                 self.get_part().LogError("尝试tick递归的sub_state: {}".format(self.current_sub_state_name))
-        for callback in self.callbacks_tick:
+        callbacks = self.callbacks_tick if self.tick_schedule is None else self._collect_tick_callbacks()
+        for callback in callbacks:
             try:
                 callback()
             except Exception as e:
-                self.get_part().LogError("GamingState.tick callback error: " + str(e))
-                traceback.print_exc()
+                self._on_callback_error('tick', e)
+
+    def tick_profiled(self, profiler, state_path):
+        """
+        @description 开启耗时统计时代替tick的逻辑驱动，行为与tick相同
+        :type profiler: TickProfiler
+        :param state_path: 本状态的路径
+        :type state_path: str
+        """
+        if self.current_sub_state_name is not None and self.current_sub_state is not None:
+            if self.current_sub_state._overrides_tick():
+                try:
+                    profiler.call(state_path + '/' + self.current_sub_state_name, 'tick', self.current_sub_state.tick)
+                except Exception as e:
+                    self.current_sub_state._on_callback_error('tick', e)
+            elif self.current_sub_state != self:
+                self.current_sub_state.tick_profiled(profiler, state_path + '/' + self.current_sub_state_name)
+            else:
+                self.get_part().LogError("尝试tick递归的sub_state: {}".format(self.current_sub_state_name))
+        callbacks = self.callbacks_tick if self.tick_schedule is None else self._collect_tick_callbacks()
+        for callback in callbacks:
+            try:
+                profiler.call(state_path, 'tick', callback)
+            except Exception as e:
+                self._on_callback_error('tick', e)
+
+    def _overrides_tick(self):
+        # 子类override了tick时，根状态不能展开它的子树，需要调用它自己的tick
+        return type(self).tick.__func__ is not GamingState.tick.__func__
+
+    def _collect_tick_callbacks(self):
+        # 取出本tick到期的间隔回调，按优先级与每个tick都执行的回调合并（同优先级时每个tick都执行的回调在前）
+        due = self.tick_schedule.collect()
+        callbacks = self.callbacks_tick
+        if due is None:
+            return callbacks
+        priorities = self.tick_priorities
+        count = len(callbacks)
+        merged = list()
+        index = 0
+        for negative_priority, _, callback in due:
+            while index < count and (priorities[index] if priorities else 0) >= -negative_priority:
+                merged.append(callbacks[index])
+                index += 1
+            merged.append(callback)
+        merged.extend(callbacks[index:])
+        return merged
+
+    def _run_callbacks(self, callbacks, phase):
+        if not callbacks:
+            return
+        part = self.get_part()
+        profiler = part.profiler if part is not None else None
+        state_path = self.get_state_path() if profiler is not None else None
+        for callback in callbacks:
+            try:
+                if profiler is None:
+                    callback()
+                else:
+                    profiler.call(state_path, phase, callback)
+            except Exception as e:
+                self._on_callback_error(phase, e)
+
+    def _on_callback_error(self, phase, e):
+        part = self.get_part()
+        part.LogError("GamingState.{} callback error: ".format(phase) + str(e))
+        traceback.print_exc()
+        if part.flight_recorder is not None:
+            part.flight_recorder.on_error()
 
     # ====== API 方法 ======
 
@@ -134,32 +276,82 @@ class GamingState:
         :return: GamingStatePart
         :rtype: GamingStatePart | None
         """
-        if self.parent is not None:
-            return self.parent.get_part()
+        if self.root is not None:
+            return self.root.part
         else:
             return None
 
-    def listen_engine_event(self, event_name, callback):
+    def get_root_state(self):
+        """
+        @description 获取根状态
+        :rtype: RootGamingState | None
+        """
+        return self.root
+
+    def schedule_after(self, delay, callback):
+        """
+        @description 延迟一段时间后执行一次回调，本状态退出时自动取消
+        :param delay: 延迟时间（秒）
+        :type delay: float
+        :param callback: 回调函数，例如：lambda: print("time up")
+        :type callback: callable
+        :return: 定时任务，可用于cancel_timer
+        """
+        return self.get_root_state().schedule_after(delay, callback, self)
+
+    def schedule_every(self, interval, callback, delay=None):
+        """
+        @description 每隔一段时间执行一次回调，本状态退出时自动取消
+        :param interval: 间隔时间（秒）
+        :type interval: float
+        :param callback: 回调函数，例如：lambda: print("refill")
+        :type callback: callable
+        :param delay: 第一次执行前的延迟（秒），默认与interval相同
+        :type delay: float | None
+        :return: 定时任务，可用于cancel_timer
+        """
+        return self.get_root_state().schedule_every(interval, callback, self, delay)
+
+    def _add_timer(self, timer):
+        if self.scheduled_timers is EMPTY:
+            self.scheduled_timers = list()
+        self.scheduled_timers.append(timer)
+
+    def _remove_timer(self, timer):
+        if timer in self.scheduled_timers:
+            self.scheduled_timers.remove(timer)
+
+    def cancel_timer(self, timer):
+        """
+        @description 取消通过schedule_after/schedule_every创建的定时任务
+        """
+        self.get_root_state().cancel(timer)
+
+    def listen_engine_event(self, event_name, callback, key=None, value=None):
         """
         @description 监听引擎事件
         :param event_name: 事件名称
         :type event_name: str
         :param callback: 回调函数(self, args...)
         :type callback: callable
+        :param key: 事件参数中的字段，与value一起使用，见listen_event
+        :type key: str | None
         """
-        self.listen_event("Minecraft", "Engine", event_name, callback)
+        self.listen_event("Minecraft", "Engine", event_name, callback, key, value)
 
-    def listen_preset_event(self, event_name, callback):
+    def listen_preset_event(self, event_name, callback, key=None, value=None):
         """
         @description 监听预设事件
         :param event_name: 事件名称
         :type event_name: str
         :param callback: 回调函数(self, args...)
         :type callback: callable
+        :param key: 事件参数中的字段，与value一起使用，见listen_event
+        :type key: str | None
         """
-        self.listen_event("Minecraft", "preset", event_name, callback)
+        self.listen_event("Minecraft", "preset", event_name, callback, key, value)
 
-    def listen_event(self, namespace, system_name, event_name, callback):
+    def listen_event(self, namespace, system_name, event_name, callback, key=None, value=None):
         """
         @description 监听引擎事件
         :param namespace: 命名空间
@@ -170,47 +362,83 @@ class GamingState:
         :type event_name: str
         :param callback: 回调函数(self, args...)
         :type callback: callable
+        :param key: 只接收 args[key] == value 的事件，例如 key='playerId', value=player_id；
+            路由表按值建立索引，其它玩家的事件不会调用该回调
+        :type key: str | None
+        :param value: key字段的值（需要可以hash）
         """
         event_callback = EventCallback(self, callback)
-        self.listened_events.append(EventListenContext(namespace, system_name, event_name, event_callback, event_callback.call))
+        listener = EventListenContext(namespace, system_name, event_name, event_callback, event_callback.call, key, value)
+        if self.listened_events is EMPTY:
+            self.listened_events = list()
+        self.listened_events.append(listener)
         if self.is_state_running():
-            self.get_part().ListenForEvent(
-                namespace, system_name, event_name, event_callback,
-                event_callback.call
-            )
-        # 会在enter时监听，exit时取消监听
+            self.get_part().event_router.activate(listener)
+        # 会在enter时加入路由表，exit时移出路由表
 
-    def listen_self_event(self, event_name, callback):
+    def listen_self_event(self, event_name, callback, key=None, value=None):
         """
         @description 监听自定义事件
         :param event_name: 事件名称
         :type event_name: str
         :param callback: 回调函数(self, args...)
         :type callback: callable
+        :param key: 事件参数中的字段，与value一起使用，见listen_event
+        :type key: str | None
         """
         event_callback = EventCallback(self, callback)
-        self.listened_self_events.append(EventListenContext(None, None, event_name, event_callback, event_callback.call))
+        listener = EventListenContext(None, None, event_name, event_callback, event_callback.call, key, value)
+        if self.listened_self_events is EMPTY:
+            self.listened_self_events = list()
+        self.listened_self_events.append(listener)
         if self.is_state_running():
-            self.get_part().ListenSelfEvent(
-                event_name,
-                event_callback,
-                event_callback.call
-            )
-        # 会在enter时监听，exit时取消监听
+            self.get_part().event_router.activate(listener)
+        # 会在enter时加入路由表，exit时移出路由表
 
     def add_sub_state(self, name, state_supplier, *args, **kwargs):
         """
         @description 添加子状态
         :param name: 子状态名称
         :type name: str
-        :param state_supplier: 一个返回子状态对象的lambda函数，可以接受任意数量的位置参数和关键字参数
-        :type state_supplier: callable
+        :param state_supplier: 一个返回子状态对象的lambda函数，可以接受任意数量的位置参数和关键字参数；
+            也可以是 "模块:类名" 的字符串，第一次进入该子状态时才导入模块
+        :type state_supplier: callable | str
         :param args: 传递给state_supplier的位置参数
         :param kwargs: 传递给state_supplier的关键字参数
         """
         if name in self.sub_states:
             raise ValueError("添加子状态时，状态名 {} 已存在".format(name))
-        self.sub_states[name] = lambda parent: state_supplier(parent, *args, **kwargs)
+        if self.sub_states is EMPTY_SUB_STATES:
+            self.sub_states = OrderedSubStates()
+        self.sub_states[name] = _bind_supplier(state_supplier, args, kwargs)
+
+    def insert_sub_state_after(self, anchor_name, name, state_supplier, *args, **kwargs):
+        """
+        @description 在指定子状态之后插入子状态（运行中也可以插入）
+        :param anchor_name: 插入位置的子状态名称
+        :type anchor_name: str
+        :param name: 子状态名称
+        :type name: str
+        :param state_supplier: 一个返回子状态对象的lambda函数，可以接受任意数量的位置参数和关键字参数，或 "模块:类名" 的字符串
+        :type state_supplier: callable | str
+        """
+        if name in self.sub_states:
+            raise ValueError("添加子状态时，状态名 {} 已存在".format(name))
+        self.sub_states.insert_after(anchor_name, name, _bind_supplier(state_supplier, args, kwargs))
+
+    def insert_sub_state_before(self, anchor_name, name, state_supplier, *args, **kwargs):
+        """
+        @description 在指定子状态之前插入子状态（运行中也可以插入）
+        :param anchor_name: 插入位置的子状态名称
+        :type anchor_name: str
+        :param name: 子状态名称
+        :type name: str
+        :param state_supplier: 一个返回子状态对象的lambda函数，可以接受任意数量的位置参数和关键字参数，或 "模块:类名" 的字符串
+        :type state_supplier: callable | str
+        """
+        if name in self.sub_states:
+            raise ValueError("添加子状态时，状态名 {} 已存在".format(name))
+        self.sub_states.insert_before(anchor_name, name, _bind_supplier(state_supplier, args, kwargs))
 
     def remove_sub_state(self, state_name):
         """
@@ -220,20 +448,71 @@ class GamingState:
         :return: 被移除的子状态
         :rtype: GamingState | None
         """
-        # 如果移除了一个正在进行中的状态，则自动切换到下一状态
+        self._on_transition(KIND_REMOVE, state_name, None)
+        # 如果移除了一个正在进行中的状态，则自动切换到下一状态（立即切换，不会延迟）
         if self.current_sub_state_name == state_name:
-            self.next_sub_state()
+            self._next_sub_state_now()
+        self.sub_state_pools.pop(state_name, None)
         return self.sub_states.pop(state_name)
 
+    def set_sub_state_recyclable(self, name, pool_size=1, eviction=StatePool.EVICT_OLDEST):
+        """
+        @description 设置子状态在退出后复用实例，而不是每次进入时重新实例化（默认不复用）
+        复用前会调用子状态的reset()，子状态需要在reset中清理自己的数据；运行中追加的回调和监听器会被移除
+        :param name: 子状态名称
+        :type name: str
+        :param pool_size: 最多保留的空闲实例数，为0时关闭复用
+        :type pool_size: int
+        :param eviction: 池满时的淘汰方式，StatePool.EVICT_OLDEST 或 StatePool.EVICT_NEWEST
+        :type eviction: str
+        """
+        if name not in self.sub_states:
+            raise ValueError("State {} not found".format(name))
+        if pool_size <= 0:
+            self.sub_state_pools.pop(name, None)
+        else:
+            if self.sub_state_pools is EMPTY_DICT:
+                self.sub_state_pools = {}
+            self.sub_state_pools[name] = StatePool(pool_size, eviction)
+
     def is_state_running(self):
         """
         @description 检查父状态的当前子状态是否是自己（也就是说，当前状态是正在运行生效）
         """
-        if self.parent is None:
-            return True
-        elif self.parent.current_sub_state_name is None:
-            return False
-        return self.parent.current_sub_state == self
+        return self.running
+
+    def is_state_active(self):
+        """
+        @description 检查自己以及所有父状态是否都在运行（也就是说，当前状态在根状态的运行路径上）
+        """
+        state = self
+        while state.parent is not None:
+            if not state.running:
+                return False
+            state = state.parent
+        return True
+
+    def get_state_path(self):
+        """
+        @description 获取自己在状态树中的路径，例如 root/game/stage1（不在运行的层级记为?）
+        :rtype: str
+        """
+        names = list()
+        state = self
+        while state.parent is not None:
+            parent = state.parent
+            names.append(parent.current_sub_state_name if parent.current_sub_state is state else '?')
+            state = parent
+        names.append(state.get_path_name())
+        names.reverse()
+        return '/'.join(names)
+
+    def get_path_name(self):
+        """
+        @description 作为根状态时在路径中的名称
+        :rtype: str
+        """
+        return 'root'
 
     def get_runtime_state_name(self):
         """
@@ -247,15 +526,17 @@ class GamingState:
 
     def next_sub_state(self):
         """
-        @description 进入下一个子状态
+        @description 进入下一个子状态（开启了延迟切换时，在本tick的最后才切换）
         """
-        keys = list(self.sub_states.keys())
+        if self.root is not None and self.root.transition_queue is not None:
+            self.root.transition_queue.request_next(self)
+        else:
+            self._next_sub_state_now()
 
+    def _next_sub_state_now(self):
         if self.current_sub_state_name is None:
-            if len(keys) > 0:
-                next_state_name = keys[0]
-                self.get_part().LogDebug("next_sub_state: None -> " + next_state_name)
-                self.toggle_sub_state(next_state_name)
+            if len(self.sub_states) > 0:
+                self._switch_sub_state(self.sub_states.first(), KIND_NEXT)
             else:
                 self.parent.next_sub_state()
                 for callback in self.callbacks_no_such_next_sub_state:
@@ -263,44 +544,185 @@ class GamingState:
         else:
             if self.current_sub_state is None:
                 raise ValueError("Current states {} is missing".format(self.current_sub_state_name))
-            index = keys.index(self.current_sub_state_name)
-            if index + 1 < len(keys):
-                previous_state_name = self.current_sub_state_name
-                next_state_name = keys[index + 1]
-                self.get_part().LogDebug("next_sub_state: {} -> {}".format(previous_state_name, next_state_name))
-                self.toggle_sub_state(next_state_name)
+            previous_state_name = self.current_sub_state_name
+            next_state_name = self.sub_states.next_of(previous_state_name)
+            if next_state_name is not None:
+                self._switch_sub_state(next_state_name, KIND_NEXT)
             else:
                 if self.loop:
-                    self.current_sub_state.exit()
-                    self.current_sub_state_name = None
-                    self.current_sub_state = None
-                    self.next_sub_state()
+                    self._on_transition(KIND_LOOP, previous_state_name, None)
+                    self._exit_current_sub_state()
+                    self._set_current_sub_state(None, None)
+                    self._next_sub_state_now()
                 else:
                     for callback in self.callbacks_no_such_next_sub_state:
                         callback()
-                    if self.is_state_running() and self.current_sub_state_name == keys[-1]:  # 这边需要判断进行了callback后，目前状态机是否被改变，如果被改变，表示在callback中修改了状态
-                        self.current_sub_state.exit()
-                        self.current_sub_state_name = None
-                        self.current_sub_state = None
+                    if self.is_state_running() and self.current_sub_state_name == previous_state_name:  # 这边需要判断进行了callback后，目前状态机是否被改变，如果被改变，表示在callback中修改了状态
+                        self._exit_current_sub_state()
+                        self._set_current_sub_state(None, None)
+                        self._on_transition(KIND_BUBBLE_UP, previous_state_name, None)
                         if self.parent is not None:
                             self.parent.next_sub_state()
 
     def toggle_sub_state(self, state_name):
         """
-        @description 切换子状态
+        @description 切换子状态（开启了延迟切换时，在本tick的最后才切换）
         :param state_name: 子状态名称
         :type state_name: str
         """
+        if self.root is not None and self.root.transition_queue is not None:
+            if state_name not in self.sub_states:
+                raise ValueError("State {} not found".format(state_name))
+            self.root.transition_queue.request_toggle(self, state_name)
+        else:
+            self._switch_sub_state(state_name, KIND_TOGGLE)
+
+    def _apply_transition(self, kind, state_name):
+        # 执行延迟的切换请求，state_name为None时表示子状态已经全部结束
+        if state_name is None:
+            self._finish_sub_states()
+        elif state_name not in self.sub_states:
+            self.get_part().LogError("GamingState: 延迟切换的子状态 {} 已被移除".format(state_name))
+        else:
+            self._switch_sub_state(state_name, kind)
+
+    def _finish_sub_states(self):
+        # 延迟切换时没有下一个子状态：与next_sub_state相同，回调没有请求其它切换时，退出当前子状态并切换父状态
+        previous_state_name = self.current_sub_state_name
+        for callback in self.callbacks_no_such_next_sub_state:
+            callback()
+        queue = self.root.transition_queue
+        if (queue is not None and queue.has_pending(self)) or self.current_sub_state_name != previous_state_name:
+            return
+        if self.current_sub_state is not None:
+            self._exit_current_sub_state()
+            self._set_current_sub_state(None, None)
+            self._on_transition(KIND_BUBBLE_UP, previous_state_name, None)
+        if self.parent is not None:
+            self.parent.next_sub_state()
+
+    def _switch_sub_state(self, state_name, kind):
         if state_name not in self.sub_states:
             raise ValueError("State {} not found".format(state_name))
+        previous_state_name = self.current_sub_state_name
         if self.current_sub_state is not None:
-            self.current_sub_state.exit()
-        self.current_sub_state_name = state_name
-        state_factory = self.sub_states[state_name]
-        self.current_sub_state = state_factory(self)
+            self._exit_current_sub_state()
+        self._on_transition(kind, previous_state_name, state_name)
+        self._set_current_sub_state(state_name, self._create_sub_state(state_name))
         self.current_sub_state.init()
         self.current_sub_state.enter()
 
+    def _set_current_sub_state(self, state_name, state):
+        # 修改当前子状态的唯一入口：维护子状态的running标记，并让根状态重新生成tick计划
+        previous_state = self.current_sub_state
+        if previous_state is not None and previous_state is not state:
+            previous_state.running = False
+        self.current_sub_state_name = state_name
+        self.current_sub_state = state
+        if state is not None:
+            state.running = True
+        if self.root is not None:
+            self.root.tick_plan = None
+
+    def _on_transition(self, kind, from_name, to_name):
+        # 运行路径发生了变化：记录切换，并标记快照需要更新
+        part = self.get_part()
+        if part is None:
+            return
+        if part.flight_recorder is not None:
+            part.flight_recorder.record(kind, self, from_name, to_name)
+        if part.state_snapshot is not None:
+            part.state_snapshot.dirty = True
+
+    def snapshot(self):
+        """
+        @description 保存快照时调用，返回需要保存的数据（需要可以JSON序列化），默认不保存（子类按需override）
+        :return: 快照数据 | 不需要保存时返回None
+        """
+        return None
+
+    def restore(self, data):
+        """
+        @description 从快照恢复时，在进入状态之后调用（子类按需override）
+        :param data: snapshot()返回的数据
+        """
+        pass
+
+    def _snapshot_entry(self, name):
+        # 本状态在快照中的记录：n 子状态名称，d snapshot()的数据
+        entry = {'n': name}
+        data = self.snapshot()
+        if data is not None:
+            entry['d'] = data
+        return entry
+
+    def _restore_entry(self, entry):
+        # 进入状态之后，恢复快照中的记录
+        if 'd' in entry:
+            self.restore(entry['d'])
+
+    def reset(self):
+        """
+        @description 复用实例前的数据清理（仅在set_sub_state_recyclable开启复用时调用，子类按需override）
+        """
+        pass
+
+    def _create_sub_state(self, state_name):
+        pool = self.sub_state_pools.get(state_name)
+        if pool is not None:
+            state = pool.acquire()
+            if state is not None:
+                return state
+            pool.created_count += 1
+        state = self.sub_states[state_name](self)
+        if pool is not None:
+            state._mark_registrations()
+        return state
+
+    def _exit_current_sub_state(self):
+        state = self.current_sub_state
+        state.exit()
+        pool = self.sub_state_pools.get(self.current_sub_state_name)
+        if pool is not None and state.registration_marks is not None and state._recycle():
+            pool.release(state)
+
+    def _mark_registrations(self):
+        self.registration_marks = (
+            len(self.listened_events), len(self.listened_self_events),
+            len(self.callbacks_init), len(self.callbacks_enter), len(self.callbacks_exit),
+            len(self.callbacks_tick), len(self.callbacks_no_such_next_sub_state),
+            # 带优先级的tick回调可能插入到中间，这里保存完整的副本
+            (tuple(self.callbacks_tick), tuple(self.tick_priorities), len(self.tick_schedule.entries) if self.tick_schedule is not None else 0),
+        )
+
+    def _recycle(self):
+        marks = self.registration_marks
+        self.listened_events = _truncated(self.listened_events, marks[0])
+        self.listened_self_events = _truncated(self.listened_self_events, marks[1])
+        self.callbacks_init = _truncated(self.callbacks_init, marks[2])
+        self.callbacks_enter = _truncated(self.callbacks_enter, marks[3])
+        self.callbacks_exit = _truncated(self.callbacks_exit, marks[4])
+        self.callbacks_no_such_next_sub_state = _truncated(self.callbacks_no_such_next_sub_state, marks[6])
+        tick_callbacks, tick_priorities, interval_count = marks[7]
+        if len(self.callbacks_tick) != len(tick_callbacks):
+            self.callbacks_tick = list(tick_callbacks) if tick_callbacks else EMPTY
+            self.tick_priorities = list(tick_priorities) if tick_priorities else EMPTY
+        if self.tick_schedule is not None and len(self.tick_schedule.entries) != interval_count:
+            if interval_count == 0:
+                self.tick_schedule = None
+            else:
+                self.tick_schedule.truncate(interval_count)
+        # 退出时不会退出子状态，这里断开对旧子状态的引用
+        self._set_current_sub_state(None, None)
+        try:
+            self.reset()
+        except Exception as e:
+            # reset失败的实例不再复用
+            self.get_part().LogError("GamingState.reset error: " + str(e))
+            traceback.print_exc()
+            return False
+        return True
+
     def set_loop(self, loop=True):
         """
         @description 设置是否循环
@@ -317,6 +739,8 @@ class GamingState:
         :param callback: 回调函数，例如：lambda: print("init")
         :type callback: callable
         """
+        if self.callbacks_init is EMPTY:
+            self.callbacks_init = list()
         self.callbacks_init.append(callback)
 
     def with_enter(self, callback):
@@ -325,6 +749,8 @@ class GamingState:
         @param callback: 回调函数，例如：lambda: print("enter")
         :type callback: callable
         """
+        if self.callbacks_enter is EMPTY:
+            self.callbacks_enter = list()
         self.callbacks_enter.append(callback)
 
     def with_exit(self, callback):
@@ -333,15 +759,45 @@ class GamingState:
         :param callback: 回调函数，例如：lambda: print("exit")
         :type callback: callable
         """
+        if self.callbacks_exit is EMPTY:
+            self.callbacks_exit = list()
         self.callbacks_exit.append(callback)
 
-    def with_tick(self, callback):
+    def with_tick(self, callback, interval=1, phase=None, priority=0):
         """
         @description 添加tick回调
         :param callback: 回调函数，例如：lambda: print("tick")
         :type callback: callable
-        """
-        self.callbacks_tick.append(callback)
+        :param interval: 每隔多少个tick执行一次，例如20为每秒一次；不执行的tick没有额外开销
+        :type interval: int
+        :param phase: 在间隔中的第几个tick执行（从进入状态时开始计算），为None时自动错开相同间隔的回调
+        :type phase: int | None
+        :param priority: 优先级，同一tick中数值大的先执行，相同时按添加顺序
+        :type priority: int
+        """
+        if interval < 1:
+            raise ValueError("with_tick的间隔必须大于等于1: {}".format(interval))
+        if self.running and self.root is not None:
+            # 运行中添加的回调需要加入根状态的tick计划
+            self.root.tick_plan = None
+        if interval > 1:
+            if self.tick_schedule is None:
+                self.tick_schedule = TickSchedule()
+            self.tick_schedule.add(int(interval), phase, priority, callback)
+            return
+        if self.callbacks_tick is EMPTY:
+            self.callbacks_tick = list()
+        if priority == 0 and self.tick_priorities is EMPTY:
+            self.callbacks_tick.append(callback)
+            return
+        if self.tick_priorities is EMPTY:
+            self.tick_priorities = [0] * len(self.callbacks_tick)
+        # 插入到所有优先级不低于它的回调之后
+        index = len(self.tick_priorities)
+        while index > 0 and self.tick_priorities[index - 1] < priority:
+            index -= 1
+        self.callbacks_tick.insert(index, callback)
+        self.tick_priorities.insert(index, priority)
 
     def with_no_such_next_sub_state(self, callback):
         """
@@ -349,4 +805,6 @@ class GamingState:
         :param callback: 回调函数，例如：lambda: print("no next sub states")
         :type callback: callable
         """
+        if self.callbacks_no_such_next_sub_state is EMPTY:
+            self.callbacks_no_such_next_sub_state = list()
         self.callbacks_no_such_next_sub_state.append(callback)
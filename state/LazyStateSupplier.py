@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+# 本零件所在的包（例如 Parts.GamingState.state.LazyStateSupplier -> Parts），以.开头的引用相对于这个包
+_PARTS_PACKAGE = __name__.rsplit('.', 3)[0] if __name__.count('.') >= 3 else None
+
+
+class LazyStateSupplier(object):
+    """
+    通过 "模块:类名" 引用的子状态，第一次进入时才导入模块，之后直接使用缓存的类
+    例如 add_sub_state('game', 'SkyWars.state.GameGamingState:GameGamingState')，
+    以.开头时相对于零件所在的包，例如 '.SkyWars.state.GameGamingState:GameGamingState'
+    """
+    __slots__ = ('reference', 'state_class')
+
+    def __init__(self, reference):
+        """
+        :param reference: "模块:类名"
+        :type reference: str
+        """
+        if reference.count(':') != 1 or reference.startswith(':') or reference.endswith(':'):
+            raise ValueError("子状态引用的格式应为 模块:类名 : {}".format(reference))
+        self.reference = reference  # type: str
+        self.state_class = None  # type: type | None
+
+    def __call__(self, parent, *args, **kwargs):
+        state_class = self.state_class
+        if state_class is None:
+            state_class = self.resolve()
+        return state_class(parent, *args, **kwargs)
+
+    def resolve(self):
+        """
+        @description 导入模块并获取类（已经导入时直接返回）
+        :rtype: type
+        """
+        if self.state_class is None:
+            module_name, class_name = self.reference.split(':')
+            if module_name.startswith('.'):
+                if _PARTS_PACKAGE is None:
+                    raise ImportError("无法解析相对的子状态引用: {}".format(self.reference))
+                module = importlib.import_module(module_name, _PARTS_PACKAGE)
+            else:
+                module = importlib.import_module(module_name)
+            state_class = getattr(module, class_name, None)
+            if state_class is None:
+                raise ImportError("模块 {} 中没有 {}".format(module_name, class_name))
+            self.state_class = state_class
+        return self.state_class
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+
+class OrderedSubStates(object):
+    """
+    子状态工厂的有序表 (name) -> state_supplier
+    用法与OrderedDict相同，额外通过前后链接提供O(1)的下一个子状态查找，以及在指定子状态前后插入
+    """
+    __slots__ = ('_suppliers', '_next', '_prev', '_first', '_last')
+
+    def __init__(self):
+        self._suppliers = {}  # type: dict[str, callable]
+        self._next = {}  # type: dict[str, str | None]
+        self._prev = {}  # type: dict[str, str | None]
+        self._first = None  # type: str | None
+        self._last = None  # type: str | None
+
+    def __len__(self):
+        return len(self._suppliers)
+
+    def __contains__(self, name):
+        return name in self._suppliers
+
+    def __getitem__(self, name):
+        return self._suppliers[name]
+
+    def __setitem__(self, name, supplier):
+        if name not in self._suppliers:
+            self._link(name, self._last, None)
+        self._suppliers[name] = supplier
+
+    def __iter__(self):
+        name = self._first
+        while name is not None:
+            yield name
+            name = self._next[name]
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self._suppliers[name] for name in self]
+
+    def items(self):
+        return [(name, self._suppliers[name]) for name in self]
+
+    def get(self, name, default=None):
+        return self._suppliers.get(name, default)
+
+    def pop(self, name, *default):
+        if name not in self._suppliers:
+            if default:
+                return default[0]
+            raise KeyError(name)
+        self._unlink(name)
+        return self._suppliers.pop(name)
+
+    def first(self):
+        """
+        @description 第一个子状态名称
+        :rtype: str | None
+        """
+        return self._first
+
+    def last(self):
+        """
+        @description 最后一个子状态名称
+        :rtype: str | None
+        """
+        return self._last
+
+    def next_of(self, name):
+        """
+        @description 获取下一个子状态名称
+        :return: 下一个子状态名称 | 如果已经是最后一个则返回None
+        :rtype: str | None
+        """
+        if name not in self._next:
+            raise ValueError("{} is not in sub states".format(name))
+        return self._next[name]
+
+    def insert_after(self, anchor, name, supplier):
+        """
+        @description 在指定子状态之后插入
+        """
+        if anchor not in self._suppliers:
+            raise ValueError("{} is not in sub states".format(anchor))
+        self._link(name, anchor, self._next[anchor])
+        self._suppliers[name] = supplier
+
+    def insert_before(self, anchor, name, supplier):
+        """
+        @description 在指定子状态之前插入
+        """
+        if anchor not in self._suppliers:
+            raise ValueError("{} is not in sub states".format(anchor))
+        self._link(name, self._prev[anchor], anchor)
+        self._suppliers[name] = supplier
+
+    def _link(self, name, prev_name, next_name):
+        self._prev[name] = prev_name
+        self._next[name] = next_name
+        if prev_name is None:
+            self._first = name
+        else:
+            self._next[prev_name] = name
+        if next_name is None:
+            self._last = name
+        else:
+            self._prev[next_name] = name
+
+    def _unlink(self, name):
+        prev_name = self._prev.pop(name)
+        next_name = self._next.pop(name)
+        if prev_name is None:
+            self._first = next_name
+        else:
+            self._next[prev_name] = next_name
+        if next_name is None:
+            self._last = prev_name
+        else:
+            self._prev[next_name] = prev_name
+
+
+class EmptySubStates(OrderedSubStates):
+    """
+    没有子状态时共享的空表（只读），添加子状态时GamingState会换成自己的OrderedSubStates
+    """
+    __slots__ = ()
+
+    def _link(self, name, prev_name, next_name):
+        raise TypeError("EmptySubStates is read-only")
+
+
+EMPTY_SUB_STATES = EmptySubStates()
@@ -1,13 +1,41 @@
 # -*- coding: utf-8 -*-
+import heapq
+import itertools
+import traceback
+
 from GamingState import GamingState
 from ..GamingStatePart import GamingStatePart
+from TransitionQueue import TransitionQueue
+from ..util.TimerWheel import TimerWheel, Timer
+from ..util.FrameClock import FrameClock, CLOCK_WALL
 
 
 class RootGamingState(GamingState):
+    __slots__ = ('part', 'arena_id', 'clock', 'timer_wheel', 'tick_count', 'tick_timers', 'tick_timer_sequence', 'tick_plan', 'transition_queue')
 
-    def __init__(self, part):
+    def __init__(self, part, arena_id=None):
+        """
+        :param part: 零件
+        :type part: GamingStatePart
+        :param arena_id: 竞技场ID，零件的默认根状态为None
+        :type arena_id: str | None
+        """
         GamingState.__init__(self, None)
+        self.root = self
         self.part = part  # type: GamingStatePart
+        self.arena_id = arena_id  # type: str | None
+        # 所有状态共用的时钟，每个tick开始时更新一次
+        self.clock = FrameClock(CLOCK_WALL)  # type: FrameClock
+        # 所有状态共用的定时器，每个tick只处理到期的定时任务
+        self.timer_wheel = TimerWheel(self.get_time(), runner=self._run_timer, error_handler=self._on_timer_error)
+        # 按tick数计时的定时任务 (到期的tick, 序号, Timer)，是一个最小堆
+        self.tick_count = 0  # type: int
+        self.tick_timers = list()  # type: list[tuple[int, int, Timer]]
+        self.tick_timer_sequence = itertools.count()
+        # 运行路径上有tick回调的状态，从最深的子状态到根状态排列；运行路径变化时置为None，下一次tick时重新生成
+        self.tick_plan = None  # type: list[tuple[GamingState, list[callable] | None]] | None
+        # 延迟执行的状态切换，默认关闭（None）时立即切换
+        self.transition_queue = None  # type: TransitionQueue | None
         self.init()
         self.with_enter(self._on_enter)
         self.with_no_such_next_sub_state(self._on_no_such_next_sub_state)
@@ -15,9 +43,245 @@ class RootGamingState(GamingState):
     def get_part(self):
         return self.part
 
+    def get_root_state(self):
+        return self
+
+    def get_path_name(self):
+        if self.arena_id is None:
+            return 'root'
+        return 'arena:{}'.format(self.arena_id)
+
+    def tick(self):
+        self.timer_wheel.advance(self.clock.update())
+        self.tick_count += 1
+        if self.tick_timers and self.tick_timers[0][0] <= self.tick_count:
+            self._run_tick_timers()
+        profiler = self.part.profiler
+        if profiler is None:
+            self._run_tick_plan()
+        else:
+            self.tick_profiled(profiler, self.get_path_name())
+        if self.transition_queue is not None and self.transition_queue.order:
+            self.transition_queue.process()
+
+    def set_deferred_transitions(self, enabled=True, max_cascades=8):
+        """
+        @description 开启或关闭延迟切换：next_sub_state/toggle_sub_state在本tick的tick回调全部执行完之后才切换
+        开启后在tick之外（事件回调、InitServer等）请求的切换也会在下一个tick的最后执行
+        :param enabled: 是否开启，关闭时立即执行还没有执行的切换
+        :type enabled: bool
+        :param max_cascades: 每个tick最多处理的连续切换轮数
+        :type max_cascades: int
+        """
+        if enabled:
+            if self.transition_queue is None:
+                self.transition_queue = TransitionQueue(self, max_cascades)
+            else:
+                self.transition_queue.max_cascades = max_cascades
+        elif self.transition_queue is not None:
+            queue = self.transition_queue
+            self.transition_queue = None
+            # 还没有执行的请求立即执行，执行中新的请求也会立即切换
+            queue.process()
+
+    def _run_tick_plan(self):
+        # 与GamingState.tick的递归顺序相同（子状态在前），但只遍历一次生成好的列表
+        # tick中发生切换时，本tick仍按旧的计划执行完（与递归时已经进入的各层继续执行相同）
+        plan = self.tick_plan
+        if plan is None:
+            plan = self.tick_plan = self._build_tick_plan()
+        for state, callbacks in plan:
+            if callbacks is None:
+                callbacks = state._collect_tick_callbacks()
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    state._on_callback_error('tick', e)
+
+    def _build_tick_plan(self):
+        path = [self]
+        state = self
+        while state.current_sub_state_name is not None and state.current_sub_state is not None:
+            if state.current_sub_state in path:
+                self.part.LogError("尝试tick递归的sub_state: {}".format(state.current_sub_state_name))
+                break
+            state = state.current_sub_state
+            path.append(state)
+            if state._overrides_tick():
+                break
+        plan = list()
+        for state in reversed(path):
+            # 有间隔回调的状态每个tick都要取出到期的回调（None），其余状态直接使用回调列表；
+            # override了tick的状态由它自己的tick驱动它和它的子状态
+            if state is not self and state._overrides_tick():
+                plan.append((state, [state.tick]))
+            elif state.tick_schedule is not None:
+                plan.append((state, None))
+            elif state.callbacks_tick:
+                plan.append((state, state.callbacks_tick))
+        return plan
+
+    # ====== 定时器 ======
+
+    def get_time(self):
+        """
+        @description 获取当前时间（本tick开始时的时间，所有计时和定时任务都使用这个时间）
+        :return: 当前时间（秒）
+        :rtype: float
+        """
+        return self.clock.now
+
+    def set_clock(self, mode, tick_seconds=0.05):
+        """
+        @description 设置时钟类型，当前时间保持连续，已有的计时和定时任务不受影响
+        :param mode: CLOCK_WALL 真实时间、CLOCK_TICKS 按tick数计时、CLOCK_VIRTUAL 只通过advance_clock前进
+        :type mode: str
+        :param tick_seconds: CLOCK_TICKS每个tick前进的时间（秒）
+        :type tick_seconds: float
+        """
+        self.clock = FrameClock(mode, self.clock.now, tick_seconds)
+
+    def advance_clock(self, seconds):
+        """
+        @description 让虚拟时钟前进（例如在测试中快进整局比赛），到期的计时和定时任务在下一次tick时触发
+        :param seconds: 前进的时间（秒）
+        :type seconds: float
+        """
+        self.clock.advance(seconds)
+
+    def schedule_at(self, deadline, callback, owner=None):
+        """
+        @description 在指定时间执行一次回调
+        :param deadline: 执行时间（秒），与get_time()同一时间基准
+        :type deadline: float
+        :param callback: 回调函数，例如：lambda: print("time up")
+        :type callback: callable
+        :param owner: 所属状态，该状态退出时自动取消
+        :type owner: GamingState | None
+        :return: 定时任务，可用于cancel
+        :rtype: Timer
+        """
+        timer = Timer(deadline, None, callback, owner)
+        if owner is not None:
+            owner._add_timer(timer)
+        return self.timer_wheel.schedule(timer)
+
+    def schedule_after(self, delay, callback, owner=None):
+        """
+        @description 延迟一段时间后执行一次回调
+        :param delay: 延迟时间（秒）
+        :type delay: float
+        :param callback: 回调函数，例如：lambda: print("time up")
+        :type callback: callable
+        :param owner: 所属状态，该状态退出时自动取消
+        :type owner: GamingState | None
+        :return: 定时任务，可用于cancel
+        :rtype: Timer
+        """
+        return self.schedule_at(self.get_time() + delay, callback, owner)
+
+    def schedule_every(self, interval, callback, owner=None, delay=None):
+        """
+        @description 每隔一段时间执行一次回调
+        :param interval: 间隔时间（秒）
+        :type interval: float
+        :param callback: 回调函数，例如：lambda: print("refill")
+        :type callback: callable
+        :param owner: 所属状态，该状态退出时自动取消
+        :type owner: GamingState | None
+        :param delay: 第一次执行前的延迟（秒），默认与interval相同
+        :type delay: float | None
+        :return: 定时任务，可用于cancel
+        :rtype: Timer
+        """
+        if interval <= 0:
+            raise ValueError("schedule_every的间隔时间必须大于0: {}".format(interval))
+        if delay is None:
+            delay = interval
+        timer = Timer(self.get_time() + delay, interval, callback, owner)
+        if owner is not None:
+            owner._add_timer(timer)
+        return self.timer_wheel.schedule(timer)
+
+    def schedule_ticks(self, ticks, callback, owner=None):
+        """
+        @description 经过指定的tick数后执行一次回调（与时钟无关，按根状态实际tick的次数计算）
+        :param ticks: tick数，小于1时在下一个tick执行
+        :type ticks: int
+        :param callback: 回调函数
+        :type callback: callable
+        :param owner: 所属状态，该状态退出时自动取消
+        :type owner: GamingState | None
+        :return: 定时任务，可用于cancel
+        :rtype: Timer
+        """
+        timer = Timer(self.tick_count + max(1, int(ticks)), None, callback, owner)
+        if owner is not None:
+            owner._add_timer(timer)
+        heapq.heappush(self.tick_timers, (timer.deadline, next(self.tick_timer_sequence), timer))
+        return timer
+
+    def _run_tick_timers(self):
+        tick_timers = self.tick_timers
+        while tick_timers and tick_timers[0][0] <= self.tick_count:
+            timer = heapq.heappop(tick_timers)[2]
+            if timer.cancelled:
+                continue
+            timer.cancelled = True
+            try:
+                self._run_timer(timer)
+            except Exception as e:
+                self._on_timer_error(timer, e)
+                traceback.print_exc()
+
+    def cancel(self, timer):
+        """
+        @description 取消定时任务
+        :type timer: Timer
+        """
+        self.timer_wheel.cancel(timer)
+        if timer.owner is not None:
+            timer.owner._remove_timer(timer)
+
+    def stop(self):
+        """
+        @description 从最深的子状态开始依次退出当前运行路径上的所有状态（移除竞技场时调用）
+        """
+        path = list()
+        state = self
+        while state is not None and state not in path:
+            path.append(state)
+            state = state.current_sub_state
+        for state in reversed(path):
+            state.exit()
+        self._set_current_sub_state(None, None)
+        if self.transition_queue is not None:
+            self.transition_queue.clear()
+
+    def _run_timer(self, timer):
+        owner = timer.owner
+        if owner is not None:
+            if not timer.is_repeating():
+                owner._remove_timer(timer)
+            # 所属状态已经不在运行路径上（例如祖先状态已退出），丢弃
+            if not owner.is_state_active():
+                self.cancel(timer)
+                return
+        profiler = self.part.profiler
+        if profiler is None:
+            timer.callback()
+        else:
+            profiler.call(owner.get_state_path() if owner is not None else self.get_path_name(), 'timer', timer.callback)
+
+    def _on_timer_error(self, timer, e):
+        self.get_part().LogError("GamingState timer callback error: " + str(e))
+        if self.part.flight_recorder is not None:
+            self.part.flight_recorder.on_error()
+
     def _on_enter(self):
         pass
 
     def _on_no_such_next_sub_state(self):
         self.get_part().LogInfo("RootGamingState is over.")
-        # TODO 对Part进行一些调用
\ No newline at end of file
+        # TODO 对Part进行一些调用
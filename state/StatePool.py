@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+
+class StatePool:
+    """
+    可复用的子状态实例池（每个子状态名称一个）
+    子状态退出后会被reset并放回池中，下次进入同名子状态时直接取出复用，而不是重新实例化
+    """
+    # 池满时丢弃最早放回的实例
+    EVICT_OLDEST = 'oldest'
+    # 池满时丢弃刚退出的实例
+    EVICT_NEWEST = 'newest'
+
+    def __init__(self, max_size=1, eviction=EVICT_OLDEST):
+        """
+        :param max_size: 池中最多保留的实例数
+        :type max_size: int
+        :param eviction: 池满时的淘汰方式，EVICT_OLDEST 或 EVICT_NEWEST
+        :type eviction: str
+        """
+        if max_size < 1:
+            raise ValueError("StatePool的容量必须大于0: {}".format(max_size))
+        if eviction not in (StatePool.EVICT_OLDEST, StatePool.EVICT_NEWEST):
+            raise ValueError("未知的淘汰方式: {}".format(eviction))
+        self.max_size = max_size
+        self.eviction = eviction
+        self.idle_states = list()  # type: list[GamingState]
+        # 统计
+        self.created_count = 0  # type: int
+        self.reused_count = 0  # type: int
+        self.evicted_count = 0  # type: int
+
+    def acquire(self):
+        """
+        @description 取出一个空闲实例
+        :return: 空闲实例 | 没有时返回None
+        :rtype: GamingState | None
+        """
+        if self.idle_states:
+            self.reused_count += 1
+            return self.idle_states.pop()
+        return None
+
+    def release(self, state):
+        """
+        @description 放回一个已经reset的实例
+        :type state: GamingState
+        """
+        if len(self.idle_states) >= self.max_size:
+            self.evicted_count += 1
+            if self.eviction == StatePool.EVICT_NEWEST:
+                return
+            self.idle_states.pop(0)
+        self.idle_states.append(state)
+
+    def clear(self):
+        del self.idle_states[:]
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import json
+
+from GamingState import GamingState
+from TimedGamingState import TimedGamingState
+from LazyStateSupplier import LazyStateSupplier
+
+# 状态树节点中允许的字段
+NODE_KEYS = frozenset(('name', 'class', 'args', 'kwargs', 'duration', 'loop', 'recyclable', 'states'))
+
+
+class StateTreeNode(object):
+    """
+    状态树中一个节点的子状态工厂：创建状态后，再添加节点描述中的子状态
+    """
+    __slots__ = ('state_supplier', 'args', 'kwargs', 'children', 'loop')
+
+    def __init__(self, state_supplier, args, kwargs, children, loop):
+        self.state_supplier = state_supplier
+        self.args = args  # type: list
+        self.kwargs = kwargs  # type: dict
+        # 子状态 (name, StateTreeNode, 复用的池大小)
+        self.children = children  # type: list[tuple[str, StateTreeNode, int]]
+        # 是否循环，为None时不设置
+        self.loop = loop  # type: bool | None
+
+    def __call__(self, parent):
+        state = self.state_supplier(parent, *self.args, **self.kwargs)
+        _add_children(state, self.children, self.loop)
+        return state
+
+
+def load_state_tree(tree):
+    """
+    @description 读取状态树描述，JSON字符串中的文本会转换为str
+    :param tree: dict 或 JSON字符串
+    :type tree: dict | str
+    :rtype: dict
+    """
+    if isinstance(tree, basestring):
+        tree = _to_str(json.loads(tree))
+    if not isinstance(tree, dict):
+        raise ValueError("状态树描述应为dict: {}".format(type(tree)))
+    return tree
+
+
+def build_state_tree(state, tree):
+    """
+    @description 按描述给状态添加子状态，"class" 使用 "模块:类名" 引用，第一次进入时才导入
+    例如 {"loop": true, "states": [
+        {"name": "wait", "class": "SkyWars.state.WaitGamingState:WaitGamingState"},
+        {"name": "countdown", "duration": 10},
+        {"name": "game", "class": "SkyWars.state.GameGamingState:GameGamingState", "args": [1800], "states": [...]}
+    ]}
+    节点字段：name 名称、class 类（省略时为GamingState，给出duration时为TimedGamingState）、args/kwargs 构造参数、
+    loop 是否循环、recyclable 复用实例的池大小、states 子状态
+    :type state: GamingState
+    :param tree: dict 或 JSON字符串
+    :type tree: dict | str
+    :return: 传入的状态
+    :rtype: GamingState
+    """
+    tree = load_state_tree(tree)
+    # 整棵树在这里检查并编译，子状态在父状态实例化时才添加，但错误不会等到运行中才出现
+    children = _compile_children(tree.get('states', ()))
+    _add_children(state, children, bool(tree['loop']) if 'loop' in tree else None)
+    return state
+
+
+def _add_children(state, children, loop):
+    for name, supplier, pool_size in children:
+        state.add_sub_state(name, supplier)
+        if pool_size:
+            state.set_sub_state_recyclable(name, pool_size)
+    if loop is not None:
+        state.set_loop(loop)
+
+
+def _compile_children(nodes):
+    children = [_compile_node(node) for node in nodes]
+    names = set()
+    for name, _, _ in children:
+        if name in names:
+            raise ValueError("状态树中同一层的状态名 {} 重复".format(name))
+        names.add(name)
+    return children
+
+
+def _compile_node(node):
+    if not isinstance(node, dict):
+        raise ValueError("状态树节点应为dict: {}".format(node))
+    unknown_keys = set(node) - NODE_KEYS
+    if unknown_keys:
+        raise ValueError("状态树节点 {} 中有未知的字段: {}".format(node.get('name'), ', '.join(sorted(unknown_keys))))
+    name = node.get('name')
+    if not name:
+        raise ValueError("状态树节点缺少name: {}".format(node))
+    args = list(node.get('args', ()))
+    if 'class' in node:
+        state_supplier = LazyStateSupplier(node['class'])
+    elif 'duration' in node:
+        state_supplier = TimedGamingState
+        args.insert(0, node['duration'])
+    else:
+        state_supplier = GamingState
+    children = _compile_children(node.get('states', ()))
+    loop = bool(node['loop']) if 'loop' in node else None
+    supplier = StateTreeNode(state_supplier, args, dict(node.get('kwargs', {})), children, loop)
+    return name, supplier, int(node.get('recyclable') or 0)
+
+
+def _to_str(value):
+    # json读取的文本为unicode，状态名称等统一使用str
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return [_to_str(item) for item in value]
+    if isinstance(value, dict):
+        return dict((_to_str(key), _to_str(item)) for key, item in value.items())
+    return value
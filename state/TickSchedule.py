@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+# 自动选择相位时的起点，各状态轮流错开，避免不同状态中相同间隔的回调挤在同一个tick
+_phase_offsets = itertools.count()
+
+
+class TickSchedule(object):
+    """
+    带间隔的tick回调表（with_tick的interval大于1时使用）
+    同一间隔的回调按相位分到interval个桶中，每个tick只取出当前相位的桶，不在本tick执行的回调没有额外开销
+    """
+    __slots__ = ('entries', 'groups', 'tick_count', 'sequence')
+
+    def __init__(self):
+        # 按注册顺序保存的回调 (interval, phase, priority, callback)
+        self.entries = list()  # type: list[tuple]
+        # interval -> 每个相位一个桶，桶内为 (-priority, seq, callback)，按优先级从高到低排列
+        self.groups = {}  # type: dict[int, list[list[tuple]]]
+        # 进入状态后经过的tick数
+        self.tick_count = 0  # type: int
+        self.sequence = 0  # type: int
+
+    def add(self, interval, phase, priority, callback):
+        """
+        @description 添加回调
+        :param interval: 间隔（tick），大于1
+        :type interval: int
+        :param phase: 相位，为None时放到该间隔中回调最少的相位
+        :type phase: int | None
+        :param priority: 优先级，数值大的先执行
+        :type priority: int
+        :return: 实际使用的相位
+        :rtype: int
+        """
+        buckets = self.groups.get(interval)
+        if buckets is None:
+            buckets = [list() for _ in range(interval)]
+            self.groups[interval] = buckets
+        if phase is None:
+            offset = next(_phase_offsets)
+            phase = min([(index + offset) % interval for index in range(interval)], key=lambda index: len(buckets[index]))
+        else:
+            phase %= interval
+        self.entries.append((interval, phase, priority, callback))
+        self._insert(buckets[phase], priority, callback)
+        return phase
+
+    def truncate(self, length):
+        """
+        @description 只保留前length个注册的回调（状态复用时去掉运行中追加的回调）
+        """
+        entries = self.entries[:length]
+        self.entries = list()
+        self.groups = {}
+        self.sequence = 0
+        for interval, phase, priority, callback in entries:
+            self.add(interval, phase, priority, callback)
+
+    def collect(self):
+        """
+        @description 推进一个tick，取出本tick需要执行的回调
+        :return: 按优先级排列的 (-priority, seq, callback)，没有时返回None
+        :rtype: list[tuple] | None
+        """
+        tick = self.tick_count
+        self.tick_count = tick + 1
+        due = None
+        for interval, buckets in self.groups.items():
+            bucket = buckets[tick % interval]
+            if bucket:
+                if due is None:
+                    due = bucket
+                else:
+                    due = sorted(due + bucket)
+        return due
+
+    def _insert(self, bucket, priority, callback):
+        self.sequence += 1
+        entry = (-priority, self.sequence, callback)
+        index = len(bucket)
+        while index > 0 and bucket[index - 1][:2] > entry[:2]:
+            index -= 1
+        bucket.insert(index, entry)
@@ -1,17 +1,24 @@
 # -*- coding: utf-8 -*-
-import time
+import math
 
-from GamingState import GamingState
+from GamingState import GamingState, EMPTY
+from ..util.FlightRecorder import KIND_TIMEOUT
 
 
 class TimedGamingState(GamingState):
+    __slots__ = ('duration', 'initial_duration', 'time_end', 'callbacks_timeout', 'timeout_timer', 'formatted_time_left')
+
     def __init__(self, parent, duration):
         GamingState.__init__(self, parent)
         self.duration = duration
+        self.initial_duration = duration
         self.time_end = 0
-        self.callbacks_timeout = list()
+        self.callbacks_timeout = EMPTY
+        # 超时由根状态的时间轮触发，不再每个tick检查
+        self.timeout_timer = None
+        # get_formatted_time_left的缓存 (显示的秒数, 文本)，同一秒内不再重新格式化
+        self.formatted_time_left = None  # type: tuple[float, str] | None
         self.with_enter(self._timed_on_enter)
-        self.with_tick(self._timed_on_tick)
 
     def reset_duration(self, duration):
         """
@@ -26,29 +33,60 @@ class TimedGamingState(GamingState):
         """
         @description 重置计时器
         """
-        self.get_part().LogDebug("reset_timer {} + {}".format(str(time.time()), str(self.duration)))
-        self.time_end = time.time() + self.duration
+        self.get_part().LogDebug("reset_timer {} + {}".format(str(self.get_root_state().get_time()), str(self.duration)))
+        self.set_seconds_left(self.duration)
+
+    def reset(self):
+        """
+        @description 复用实例前恢复计时数据（子类override时需要调用TimedGamingState.reset(self)）
+        """
+        self.duration = self.initial_duration
+        self.time_end = 0
+        self.timeout_timer = None
 
     def with_time_out(self, callback):
         """
         @description 设置超时回调
         :param callback: callable 回调函数
         """
+        if self.callbacks_timeout is EMPTY:
+            self.callbacks_timeout = list()
         self.callbacks_timeout.append(callback)
 
+    def _snapshot_entry(self, name):
+        # t 剩余时间（秒）
+        entry = GamingState._snapshot_entry(self, name)
+        entry['t'] = max(0.0, self.get_seconds_left())
+        return entry
+
+    def _restore_entry(self, entry):
+        if 't' in entry:
+            self.set_seconds_left(entry['t'])
+        GamingState._restore_entry(self, entry)
+
+    def set_seconds_left(self, seconds):
+        """
+        @description 设置剩余时间（不改变持续时间）
+        :param seconds: 剩余时间（秒）
+        :type seconds: float
+        """
+        root = self.get_root_state()
+        self.time_end = root.get_time() + seconds
+        if self.timeout_timer is not None:
+            root.cancel(self.timeout_timer)
+        self.timeout_timer = root.schedule_at(self.time_end, self._time_out, self)
+
     # 内部的状态机回调
 
     def _timed_on_enter(self):
         self.reset_timer()
 
-    def _timed_on_tick(self):
-        if time.time() >= self.time_end:
-            self._time_out()
-
     def _time_out(self):
+        self.timeout_timer = None
         for callback in self.callbacks_timeout:
             callback(self)
         if self.parent is not None:
+            self.parent._on_transition(KIND_TIMEOUT, self.get_runtime_state_name(), None)
             self.parent.next_sub_state()
 
     # 额外的接口
@@ -59,7 +97,7 @@ class TimedGamingState(GamingState):
         :return: 剩余时间（秒）
         :rtype: float
         """
-        return self.time_end - time.time()
+        return self.time_end - self.root.get_time()
 
     def get_seconds_passed(self):
         """
@@ -76,14 +114,21 @@ class TimedGamingState(GamingState):
         :rtype: str
         """
         seconds = self.get_seconds_left()
+        # 显示的内容只取决于剩余时间的整秒数
+        second = math.floor(seconds)
+        cached = self.formatted_time_left
+        if cached is not None and cached[0] == second:
+            return cached[1]
         hours = int(seconds / 3600)
         seconds %= 3600
         minutes = int(seconds / 60)
         seconds = int(seconds % 60)
         if hours > 0:
-            return "{:02d}:{:02d}:{:02d}".format(hours, minutes, seconds)
+            text = "{:02d}:{:02d}:{:02d}".format(hours, minutes, seconds)
         else:
-            return "{:02d}:{:02d}".format(minutes, seconds)
+            text = "{:02d}:{:02d}".format(minutes, seconds)
+        self.formatted_time_left = (second, text)
+        return text
 
     def get_formatted_time_left_mill(self):
         """
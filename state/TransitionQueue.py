@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from ..util.FlightRecorder import KIND_NEXT, KIND_TOGGLE, KIND_LOOP
+
+
+class TransitionQueue(object):
+    """
+    延迟执行的状态切换（通过GamingStatePart.enable_deferred_transitions开启，每个根状态一个）
+    next_sub_state/toggle_sub_state只记录切换请求，在根状态的tick回调全部执行完之后统一切换：
+    - 同一个状态在一轮中的多次请求合并为最终的目标，中间的子状态不会被进入和退出
+    - 切换时进入的状态又请求切换（例如enter回调中next_sub_state、子状态结束后切换父状态）时，在下一轮处理；
+      每个tick最多处理max_cascades轮，剩余的请求留到下一个tick，避免无限循环的切换卡死服务器
+    """
+    __slots__ = ('root', 'max_cascades', 'pending', 'order', 'request_count', 'collapsed_count', 'applied_count', 'overflow_count')
+
+    def __init__(self, root, max_cascades=8):
+        """
+        :param root: 根状态
+        :type root: RootGamingState
+        :param max_cascades: 每个tick最多处理的轮数
+        :type max_cascades: int
+        """
+        if max_cascades < 1:
+            raise ValueError("max_cascades必须大于等于1: {}".format(max_cascades))
+        self.root = root
+        self.max_cascades = max_cascades
+        # state -> (切换类型, 目标子状态名称)，目标为None时表示子状态已经全部结束
+        self.pending = {}  # type: dict[GamingState, tuple[str, str | None]]
+        # 请求切换的状态，按第一次请求的顺序
+        self.order = list()  # type: list[GamingState]
+
+        # 统计
+        self.request_count = 0  # type: int
+        self.collapsed_count = 0  # type: int
+        self.applied_count = 0  # type: int
+        self.overflow_count = 0  # type: int
+
+    def request_next(self, state):
+        """
+        @description 请求切换到下一个子状态（已经有请求时，从请求的目标继续往后）
+        :type state: GamingState
+        """
+        pending = self.pending.get(state)
+        if pending is not None:
+            if pending[1] is None:
+                # 已经请求结束所有子状态
+                self._put(state, pending[0], None)
+                return
+            base = pending[1]
+        else:
+            base = state.current_sub_state_name
+        if base is None:
+            self._put(state, KIND_NEXT, state.sub_states.first())
+            return
+        next_state_name = state.sub_states.next_of(base) if base in state.sub_states else None
+        if next_state_name is not None:
+            self._put(state, KIND_NEXT, next_state_name)
+        elif state.loop and len(state.sub_states) > 0:
+            self._put(state, KIND_LOOP, state.sub_states.first())
+        else:
+            self._put(state, KIND_NEXT, None)
+
+    def request_toggle(self, state, state_name):
+        """
+        @description 请求切换到指定的子状态
+        :type state: GamingState
+        :type state_name: str
+        """
+        self._put(state, KIND_TOGGLE, state_name)
+
+    def has_pending(self, state):
+        return state in self.pending
+
+    def _put(self, state, kind, state_name):
+        self.request_count += 1
+        if state in self.pending:
+            self.collapsed_count += 1
+        else:
+            self.order.append(state)
+        self.pending[state] = (kind, state_name)
+
+    def process(self):
+        """
+        @description 执行所有切换请求（根状态在tick的最后调用）
+        """
+        rounds = 0
+        while self.order:
+            if rounds >= self.max_cascades:
+                self.overflow_count += 1
+                self.root.get_part().LogError("GamingState: {} 本tick的连续切换超过{}轮，剩余的切换推迟到下一个tick".format(
+                    self.root.get_path_name(), self.max_cascades))
+                return
+            rounds += 1
+            pending = self.pending
+            # 先切换外层的状态，内层的状态因此退出时，它的请求不再执行
+            order = sorted(self.order, key=TransitionQueue._get_depth)
+            self.pending = {}
+            self.order = list()
+            for state in order:
+                if not state.is_state_active():
+                    self.collapsed_count += 1
+                    continue
+                kind, state_name = pending[state]
+                self.applied_count += 1
+                state._apply_transition(kind, state_name)
+
+    def clear(self):
+        self.pending = {}
+        self.order = list()
+
+    def get_stats(self):
+        """
+        @description 获取统计数据
+        :rtype: dict[str, int]
+        """
+        return {
+            'requests': self.request_count,
+            'collapsed': self.collapsed_count,
+            'applied': self.applied_count,
+            'overflows': self.overflow_count,
+            'pending': len(self.order),
+        }
+
+    def reset_stats(self):
+        self.request_count = 0
+        self.collapsed_count = 0
+        self.applied_count = 0
+        self.overflow_count = 0
+
+    @staticmethod
+    def _get_depth(state):
+        depth = 0
+        while state.parent is not None:
+            depth += 1
+            state = state.parent
+        return depth
@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
+import json
+from collections import OrderedDict
+
 from Preset.Model.PartBase import PartBase
+from CommandBuffer import TARGET_ALL, KIND_ACTIONBAR, KIND_TITLE, KIND_SUBTITLE, KIND_TIMES, KIND_RESET
+from TextTemplate import TextTemplateCache
+from ComponentCache import COMP_NAME
 
 replacements = {
     "enter": "\n",
@@ -26,11 +32,39 @@ replacements = {
     # Add additional mappings for icons and other special characters
 }
 
+# format_text编译后的模板缓存
+template_cache = TextTemplateCache(replacements)
+
+# 分组发送时，排除选择器 @a[name=!...] 最多排除的玩家数，超过时逐个发送
+MAX_SELECTOR_EXCLUSIONS = 8
+
 
 class BetterPartUtil:
 
     @staticmethod
     def format_text(raw_msg, **args):
+        """
+        格式化文本，替换颜色等占位符以及参数占位符
+        原文会被编译为模板并缓存，之后只需一次拼接
+        :param raw_msg: 原始文本，例如："{red}玩家 {name} 获胜"
+        :type raw_msg: str
+        :param args: 参数
+        :rtype: str
+        """
+        if isinstance(raw_msg, str):
+            template = template_cache.get(raw_msg)
+            if template.can_render(args):
+                result = template.render(args)
+                if template.is_stable(result, args):
+                    return result
+        return BetterPartUtil.format_text_legacy(raw_msg, **args)
+
+    @staticmethod
+    def format_text_legacy(raw_msg, **args):
+        """
+        逐个str.replace的格式化实现，结果与format_text相同
+        用于模板无法一次性替换时的回退，以及性能对比
+        """
         for arg in replacements:
             # Ensure the replacement is done with the correct encoding
             replacement_str = replacements[arg]
@@ -54,6 +88,8 @@ class BetterPartUtil:
         :type part: PartBase
         """
         self.part = part
+        # 玩家名称的缓存，用于生成排除选择器，玩家离开时移除
+        self.player_names = {}  # type: dict[str, str | None]
 
     def broadcast_message(self, message, color='\xc2\xa7f'):
         """
@@ -63,7 +99,7 @@ class BetterPartUtil:
         :param color: 颜色（可选）
         :type color: str
         """
-        self.part.CreateGameComponent().SetNotifyMsg(message, color)
+        self.part.component_cache.get_game_component().SetNotifyMsg(message, color)
 
     def broadcast_tip(self, tip):
         """
@@ -71,7 +107,7 @@ class BetterPartUtil:
         :param tip: 提示
         :type tip: str
         """
-        self.part.CreateGameComponent().SetTipMessage(tip)
+        self.part.component_cache.get_game_component().SetTipMessage(tip)
 
     def broadcast_popup(self, popup, sub):
         """
@@ -81,7 +117,7 @@ class BetterPartUtil:
         :param sub: 副提示
         :type sub: str
         """
-        self.part.CreateGameComponent().SetPopupNotice(popup, sub)
+        self.part.component_cache.get_game_component().SetPopupNotice(popup, sub)
 
     def broadcast_actionbar(self, text):
         """
@@ -89,13 +125,13 @@ class BetterPartUtil:
         :param text: 文本
         :type text: str
         """
-        self.part.SetCommand("title @a actionbar {}".format(text))
+        self.part.command_buffer.set_command("title @a actionbar {}".format(text), kind=KIND_ACTIONBAR)
 
     def broadcast_title_reset(self):
         """
         重置Title
         """
-        self.part.SetCommand("title @a reset")
+        self.part.command_buffer.set_command("title @a reset", kind=KIND_RESET)
 
     def broadcast_title_times(self, fadein=20, duration=20, fadeout=5):
         """
@@ -113,7 +149,7 @@ class BetterPartUtil:
             duration = 20
         if fadeout is None:
             fadeout = 5
-        self.part.SetCommand("title @a times {} {} {}".format(fadein, duration, fadeout))
+        self.part.command_buffer.set_command("title @a times {} {} {}".format(fadein, duration, fadeout), kind=KIND_TIMES)
 
     def broadcast_title(self, title, sub_title=None, fadein=None, duration=None, fadeout=None):
         """
@@ -132,7 +168,201 @@ class BetterPartUtil:
         if fadein is not None or duration is not None or fadeout is not None:
             self.broadcast_title_times(fadein, duration, fadeout)
         else:
-            self.part.SetCommand("title @a reset")
+            self.part.command_buffer.set_command("title @a reset", kind=KIND_RESET)
         if sub_title is not None:
-            self.part.SetCommand("title @a subtitle {}".format(sub_title))
-        self.part.SetCommand("title @a title {}".format(title))
+            self.part.command_buffer.set_command("title @a subtitle {}".format(sub_title), kind=KIND_SUBTITLE)
+        self.part.command_buffer.set_command("title @a title {}".format(title), kind=KIND_TITLE)
+
+    # ====== 分组发送 ======
+    # players 可以是玩家ID或BetterPlayerObject的集合；内容可以是固定值，也可以是 lambda player_id: 内容（返回None时不发送）
+    # 内容相同的玩家合并为一组：覆盖全体在线玩家时使用一次广播，只排除少数玩家时使用一条选择器命令，否则才逐个发送
+
+    def group_send_message(self, players, message, color='\xc2\xa7f'):
+        """
+        分组发送消息
+        :param players: 玩家集合
+        :type players: list[str | BetterPlayerObject]
+        :param message: 消息，或 lambda player_id: 消息
+        :type message: str | callable
+        :param color: 颜色（可选）
+        :type color: str
+        """
+        for text, player_ids, selector in self._group_players(players, message):
+            if selector == TARGET_ALL:
+                self.broadcast_message(text, color)
+            elif selector is not None:
+                # 默认颜色是UTF-8编码的str，unicode的消息与颜色统一编码后再拼接
+                if isinstance(color, unicode):
+                    color = color.encode('utf-8')
+                if isinstance(text, unicode):
+                    text = text.encode('utf-8')
+                rawtext = json.dumps({"rawtext": [{"text": color + text}]})
+                self.part.command_buffer.set_command("tellraw {} {}".format(selector, rawtext))
+            else:
+                for player_id in player_ids:
+                    self.part.get_better_player_obj(player_id).send_message(text, color)
+
+    def group_send_tip(self, players, tip):
+        """
+        分组发送Tip提示（引擎没有对部分玩家的Tip接口，只覆盖部分玩家时逐个发送）
+        :param players: 玩家集合
+        :type players: list[str | BetterPlayerObject]
+        :param tip: 提示，或 lambda player_id: 提示
+        :type tip: str | callable
+        """
+        for text, player_ids, selector in self._group_players(players, tip):
+            if selector == TARGET_ALL:
+                self.broadcast_tip(text)
+            else:
+                for player_id in player_ids:
+                    self.part.get_better_player_obj(player_id).send_tip(text)
+
+    def group_send_popup(self, players, popup, sub=""):
+        """
+        分组发送Popup提示（只覆盖部分玩家时逐个发送）
+        :param players: 玩家集合
+        :type players: list[str | BetterPlayerObject]
+        :param popup: 主提示，或 lambda player_id: (主提示, 副提示)
+        :type popup: str | callable
+        :param sub: 副提示
+        :type sub: str
+        """
+        payload = popup if callable(popup) else (popup, sub)
+        for (text, sub_text), player_ids, selector in self._group_players(players, payload):
+            if selector == TARGET_ALL:
+                self.broadcast_popup(text, sub_text)
+            else:
+                for player_id in player_ids:
+                    self.part.get_better_player_obj(player_id).send_popup(text, sub_text)
+
+    def group_send_action_bar(self, players, text):
+        """
+        分组发送ActionBar
+        :param players: 玩家集合
+        :type players: list[str | BetterPlayerObject]
+        :param text: 文本，或 lambda player_id: 文本
+        :type text: str | callable
+        """
+        for action_bar, player_ids, selector in self._group_players(players, text):
+            if selector == TARGET_ALL:
+                self.broadcast_actionbar(action_bar)
+            elif selector is not None:
+                self.part.command_buffer.set_command("title {} actionbar {}".format(selector, action_bar), kind=KIND_ACTIONBAR, target=selector)
+            else:
+                for player_id in player_ids:
+                    self.part.get_better_player_obj(player_id).send_action_bar(action_bar)
+
+    def group_send_title(self, players, title, sub_title=None, fadein=None, duration=None, fadeout=None):
+        """
+        分组发送Title
+        :param players: 玩家集合
+        :type players: list[str | BetterPlayerObject]
+        :param title: 主标题，或 lambda player_id: (主标题, 副标题)
+        :type title: str | callable
+        :param sub_title: 副标题
+        :type sub_title: str | None
+        :param fadein: 淡入时间
+        :type fadein: int | None
+        :param duration: 保持时间
+        :type duration: int | None
+        :param fadeout: 淡出时间
+        :type fadeout: int | None
+        """
+        payload = title if callable(title) else (title, sub_title)
+        for (title_text, sub_text), player_ids, selector in self._group_players(players, payload):
+            if selector == TARGET_ALL:
+                self.broadcast_title(title_text, sub_text, fadein, duration, fadeout)
+            elif selector is not None:
+                buffer = self.part.command_buffer
+                if fadein is not None or duration is not None or fadeout is not None:
+                    buffer.set_command("title {} times {} {} {}".format(
+                        selector, 20 if fadein is None else fadein, 20 if duration is None else duration, 5 if fadeout is None else fadeout),
+                        kind=KIND_TIMES, target=selector)
+                buffer.set_command("title {} title {}".format(selector, title_text), kind=KIND_TITLE, target=selector)
+                if sub_text is not None:
+                    buffer.set_command("title {} subtitle {}".format(selector, sub_text), kind=KIND_SUBTITLE, target=selector)
+            else:
+                for player_id in player_ids:
+                    self.part.get_better_player_obj(player_id).send_title(title_text, sub_text, fadein, duration, fadeout)
+
+    def group_play_sound(self, players, sound, pos, volume=1, pitch=1):
+        """
+        分组通过服务端指令播放声音
+        :param players: 玩家集合
+        :type players: list[str | BetterPlayerObject]
+        :param sound: 声音ID，或 lambda player_id: 声音ID
+        :type sound: str | callable
+        :param pos: 播放位置
+        :type pos: tuple[float, float, float]
+        :param volume: 音量
+        :type volume: float
+        :param pitch: 音调
+        :type pitch: float
+        """
+        for sound_id, player_ids, selector in self._group_players(players, sound):
+            if selector is not None:
+                self.part.command_buffer.set_command("playsound {sound} {selector} {pos} {volume} {pitch}".format(
+                    sound=sound_id,
+                    selector=selector,
+                    pos="{} {} {}".format(pos[0], pos[1], pos[2]),
+                    volume=volume,
+                    pitch=pitch
+                ))
+            else:
+                for player_id in player_ids:
+                    self.part.get_better_player_obj(player_id).play_sound(sound_id, pos, volume, pitch)
+
+    def forget_player(self, player_id):
+        """
+        清除玩家的缓存数据（玩家离开时调用）
+        :type player_id: str
+        """
+        self.player_names.pop(player_id, None)
+
+    def _group_players(self, players, payload):
+        # 按内容分组，返回 [(内容, 玩家ID列表, 选择器 | None)]
+        groups = OrderedDict()
+        for player in players:
+            player_id = player if isinstance(player, (str, unicode)) else player.GetPlayerId()
+            value = payload(player_id) if callable(payload) else payload
+            if value is None:
+                continue
+            player_ids = groups.get(value)
+            if player_ids is None:
+                player_ids = list()
+                groups[value] = player_ids
+            player_ids.append(player_id)
+        if not groups:
+            return []
+        loaded_players = self.part.GetLoadedPlayers()
+        return [(value, player_ids, self._get_group_selector(player_ids, loaded_players)) for value, player_ids in groups.items()]
+
+    def _get_group_selector(self, player_ids, loaded_players):
+        # 覆盖全体在线玩家时为@a，只差少数玩家时为排除选择器，否则为None（逐个发送）
+        if len(player_ids) < 2:
+            return None
+        included = set(player_ids)
+        excluded = [player_id for player_id in loaded_players if player_id not in included]
+        if not excluded:
+            return TARGET_ALL
+        if len(excluded) > MAX_SELECTOR_EXCLUSIONS or len(excluded) >= len(included):
+            return None
+        names = list()
+        for player_id in excluded:
+            name = self._get_player_name(player_id)
+            if not name or '"' in name:
+                return None
+            names.append('name=!"{}"'.format(name))
+        return "@a[{}]".format(",".join(names))
+
+    def _get_player_name(self, player_id):
+        if player_id in self.player_names:
+            return self.player_names[player_id]
+        try:
+            name = self.part.component_cache.get(COMP_NAME, player_id).GetName()
+        except Exception:
+            name = None
+        if isinstance(name, unicode):
+            name = name.encode('utf-8')
+        self.player_names[player_id] = name
+        return name
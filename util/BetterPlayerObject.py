@@ -3,28 +3,29 @@ import math
 from Preset.Model.Player.PlayerObject import PlayerObject
 from mod.common.minecraftEnum import ItemPosType, PlayerUISlot
 
+from CommandBuffer import KIND_ACTIONBAR, KIND_TITLE, KIND_SUBTITLE, KIND_TIMES, KIND_CLEAR
+from ComponentCache import COMP_ITEM, COMP_PLAYER
+
 from ..GamingStatePart import GamingStatePart
 
 
-class BetterPlayerObject(PlayerObject):
+class BetterPlayerObject(object):
+    """
+    对引擎PlayerObject的包装，属性访问按需委托给原对象，不再复制属性
+    由GamingStatePart按玩家缓存，玩家离开时移除
+    """
     def __init__(self, part, player_obj):
-        PlayerObject.__init__(self)
         self.part = part  # type: GamingStatePart
-        for attr_name in dir(player_obj):
-            if not attr_name.startswith('__') and not attr_name == 'system' and not callable(
-                    getattr(player_obj, attr_name)):
-                try:
-                    # 尝试设置属性
-                    setattr(self, attr_name, getattr(player_obj, attr_name))
-                except AttributeError:
-                    # 无法设置属性时打印警告信息
-                    print("警告: 无法设置属性 '" + attr_name + "'，该属性可能是只读的或与内建属性冲突")
-                except Exception as e:
-                    # 捕获其他异常并打印
-                    print("错误: 在设置属性 '" + attr_name + "' 时发生异常: " + e)
+        self.player_obj = player_obj  # type: PlayerObject
+
+    def __getattr__(self, attr_name):
+        # 只有自身找不到的属性才会走到这里，委托给引擎的PlayerObject
+        if attr_name == 'player_obj':
+            raise AttributeError(attr_name)
+        return getattr(self.player_obj, attr_name)
 
     def clear_title(self):
-        self.SetCommand("title @s clear", self.GetPlayerId())
+        self.part.command_buffer.set_command("title @s clear", self.GetPlayerId(), KIND_CLEAR)
 
     def send_action_bar(self, action_bar):
         """
@@ -32,7 +33,7 @@ class BetterPlayerObject(PlayerObject):
         :param action_bar: 文本内容
         :type action_bar: str
         """
-        self.SetCommand("title @s actionbar {}".format(action_bar), self.GetPlayerId())
+        self.part.command_buffer.set_command("title @s actionbar {}".format(action_bar), self.GetPlayerId(), KIND_ACTIONBAR)
 
     def set_title_times(self, fadein=20, duration=20, fadeout=5):
         """
@@ -51,7 +52,7 @@ class BetterPlayerObject(PlayerObject):
             duration = 20
         if fadeout is None:
             fadeout = 5
-        self.SetCommand("title @s times {} {} {}".format(fadein, duration, fadeout), self.GetPlayerId())
+        self.part.command_buffer.set_command("title @s times {} {} {}".format(fadein, duration, fadeout), self.GetPlayerId(), KIND_TIMES)
 
     def send_title(self, title, sub_title=None, fadein=None, duration=None, fadeout=None):
         """
@@ -70,10 +71,10 @@ class BetterPlayerObject(PlayerObject):
         if fadein is not None or duration is not None or fadeout is not None:
             self.set_title_times(fadein, duration, fadeout)
 
-        self.SetCommand("title @s title {}".format(title), self.GetPlayerId())
+        self.part.command_buffer.set_command("title @s title {}".format(title), self.GetPlayerId(), KIND_TITLE)
 
         if sub_title is not None:
-            self.SetCommand("title @s subtitle {}".format(sub_title), self.GetPlayerId())
+            self.part.command_buffer.set_command("title @s subtitle {}".format(sub_title), self.GetPlayerId(), KIND_SUBTITLE)
 
     def send_message(self, message, color='\xc2\xa7f'):
         """
@@ -101,11 +102,26 @@ class BetterPlayerObject(PlayerObject):
         :param sub: 副提示
         :type sub: str
         """
-        self.CreateGameComponent().SetOnePopupNotice(self.GetPlayerId(), popup, sub)
+        self.part.component_cache.get_game_component().SetOnePopupNotice(self.GetPlayerId(), popup, sub)
+
+    def update_hud(self, channel, text, sub=None):
+        """
+        更新HUD内容，与上次发送的内容相同时跳过（内容不变时按刷新间隔重新发送）
+        :param channel: 通道，例如 HUD_ACTIONBAR、HUD_TIP、HUD_POPUP、HUD_TITLE
+        :type channel: str
+        :param text: 文本内容
+        :type text: str
+        :param sub: popup的副提示或title的副标题
+        :type sub: str | None
+        :return: 是否发送
+        :rtype: bool
+        """
+        return self.part.hud.update(self.GetPlayerId(), channel, text, sub)
 
-    def play_client_sound(self, sound, pos, volume=1, pitch=1, loop=False):
+    def play_client_sound(self, sound, pos, volume=1, pitch=1, loop=False, delay=0):
         """
         播放客户端声音，不可同时播放多个同sound
+        服务端调用时，同一tick内的声音会合并为一个事件发送给客户端
         :param sound: 声音ID
         :type sound: str
         :param pos: 播放位置
@@ -116,21 +132,13 @@ class BetterPlayerObject(PlayerObject):
         :type pitch: float
         :param loop: 循环
         :type: loop: bool
+        :param delay: 延迟播放的时间（秒），例如用于在同一tick内排好一段音符
+        :type delay: float
         """
         if self.isClient:
-            import mod.client.extraClientApi as clientApi
-            comp = clientApi.GetEngineCompFactory().CreateCustomAudio(self.GetLevelId())
-            comp.PlayCustomMusic(sound, pos, volume, pitch, loop, None)
+            self.part.client_play_sound(sound, pos, volume, pitch, loop, delay)
         else:
-            data = {
-                'player_id': self.GetPlayerId(),
-                'sound': sound,
-                'pos': pos,
-                'volume': volume,
-                'pitch': pitch,
-                'loop': loop
-            }
-            self.part.NotifyToClient(self.GetPlayerId(), "S2CPlaySoundEvent", data)
+            self.part.client_sound_buffer.play(self.GetPlayerId(), sound, pos, volume, pitch, loop, delay)
 
     def play_sound(self, sound, pos, volume=1, pitch=1):
         """
@@ -145,7 +153,7 @@ class BetterPlayerObject(PlayerObject):
         :type pitch: floatXQXQ
         """
 
-        self.SetCommand("playsound {sound} @s {pos} {volume} {pitch}".format(
+        self.part.command_buffer.set_command("playsound {sound} @s {pos} {volume} {pitch}".format(
             sound=sound,
             pos="{} {} {}".format(pos[0], pos[1], pos[2]),
             volume=volume,
@@ -174,11 +182,19 @@ class BetterPlayerObject(PlayerObject):
             self.SetRot((pitch, yaw))
 
     def set_game_type(self, mode):
-        comp_player = self.part.GetApi().GetEngineCompFactory().CreatePlayer(self.GetPlayerId())
+        comp_player = self.part.component_cache.get(COMP_PLAYER, self.GetPlayerId())
         comp_player.SetPlayerGameType(mode)
 
+    def apply_inventory_kit(self, kit):
+        """
+        发放物品套装，只发送有变化的格子
+        :param kit: 物品套装
+        :type kit: InventoryKit
+        """
+        self.part.kit_queue.apply(kit, self.GetPlayerId())
+
     def clear_inventory(self):
-        comp = self.CreateItemComponent(self.GetPlayerId())
+        comp = self.part.component_cache.get(COMP_ITEM, self.GetPlayerId(), self.CreateItemComponent)
 
         inv = comp.GetPlayerAllItems(ItemPosType.INVENTORY)
 
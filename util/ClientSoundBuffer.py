@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# 单个声音的事件（旧格式，客户端仍然兼容）
+EVENT_PLAY_SOUND = "S2CPlaySoundEvent"
+# 一个tick内同一玩家的所有声音合并为一个事件
+EVENT_PLAY_SOUND_BATCH = "S2CPlaySoundBatchEvent"
+
+
+class ClientSoundBuffer:
+    """
+    play_client_sound的每tick合并（默认开启，可通过GamingStatePart.enable_client_sound_batching关闭）
+    同一tick内发给同一玩家的声音，在TickServer结束时合并为一个S2CPlaySoundBatchEvent
+    事件数据：{'player_id': 玩家ID, 'sounds': [[sound, pos, volume, pitch, loop, delay], ...]}
+    """
+    def __init__(self, part):
+        self.part = part
+        self.enabled = True  # type: bool
+        # player_id -> 本tick内的声音列表
+        self.pending = {}  # type: dict[str, list[list]]
+
+        # 统计
+        self.sound_count = 0  # type: int
+        self.event_count = 0  # type: int
+
+    def play(self, player_id, sound, pos, volume=1, pitch=1, loop=False, delay=0):
+        """
+        @description 让玩家的客户端播放声音（开启合并时在tick结束时统一发送）
+        :param player_id: 玩家ID
+        :type player_id: str
+        :param delay: 客户端收到后延迟播放的时间（秒）
+        :type delay: float
+        """
+        self.sound_count += 1
+        if not self.enabled:
+            data = {
+                'player_id': player_id,
+                'sound': sound,
+                'pos': pos,
+                'volume': volume,
+                'pitch': pitch,
+                'loop': loop
+            }
+            if delay:
+                data['delay'] = delay
+            self._notify(player_id, EVENT_PLAY_SOUND, data)
+            return
+        sounds = self.pending.get(player_id)
+        if sounds is None:
+            sounds = list()
+            self.pending[player_id] = sounds
+        sounds.append([sound, pos, volume, pitch, loop, delay])
+
+    def flush(self):
+        """
+        @description 发送本tick内合并的声音
+        """
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = {}
+        for player_id, sounds in pending.items():
+            self._notify(player_id, EVENT_PLAY_SOUND_BATCH, {'player_id': player_id, 'sounds': sounds})
+
+    def forget(self, player_id):
+        """
+        @description 丢弃玩家还没有发送的声音（玩家离开时调用）
+        :type player_id: str
+        """
+        self.pending.pop(player_id, None)
+
+    def get_stats(self):
+        """
+        @description 获取统计数据
+        :rtype: dict[str, int]
+        """
+        return {
+            'sounds': self.sound_count,
+            'events': self.event_count,
+        }
+
+    def reset_stats(self):
+        self.sound_count = 0
+        self.event_count = 0
+
+    def _notify(self, player_id, event_name, data):
+        self.event_count += 1
+        self.part.NotifyToClient(player_id, event_name, data)
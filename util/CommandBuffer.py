@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+# 全体玩家的目标
+TARGET_ALL = '@a'
+
+# 同一目标后发的会覆盖先发的命令类型
+KIND_ACTIONBAR = 'actionbar'
+KIND_TITLE = 'title'
+KIND_SUBTITLE = 'subtitle'
+# 与上一次相同时可以丢弃的命令类型
+KIND_TIMES = 'times'
+KIND_RESET = 'reset'
+KIND_CLEAR = 'clear'
+
+# 会改变title显示参数的命令，title/subtitle的覆盖不能跨过它们
+BARRIER_KINDS = (KIND_TIMES, KIND_RESET, KIND_CLEAR)
+
+
+class CommandBuffer:
+    """
+    SetCommand的每tick缓冲（默认关闭，需要通过GamingStatePart.enable_command_buffer开启）
+    开启后，同一tick内的命令会先收集起来，在TickServer结束时统一发送：
+    - 同一目标后发的actionbar/title/subtitle会覆盖先发的
+    - 与上一次相同的times/reset命令会被丢弃
+    """
+    def __init__(self, part):
+        self.part = part
+        self.enabled = False  # type: bool
+        # 本tick内的命令 [target, kind, command, player_id]，被覆盖的位置为None
+        self.entries = list()  # type: list[list | None]
+        # (target, kind) -> 本tick内该命令在entries中的位置
+        self.last_index = {}  # type: dict[tuple, int]
+        # target -> 本tick内最后一个times/reset/clear命令在entries中的位置
+        self.last_barrier_index = {}  # type: dict[str, int]
+        self.last_any_barrier_index = -1
+        # 本tick内最后一个对选择器（例如 @a[tag=red]）的times/reset/clear命令的位置，选择器可能包含任意玩家
+        self.last_selector_barrier_index = -1
+        # target -> 最后一次发出的times/reset参数，跨tick保留，玩家没有单独记录时沿用@a的记录
+        self.title_states = {}  # type: dict[str, str]
+
+        # 统计
+        self.buffered_count = 0  # type: int
+        self.emitted_count = 0  # type: int
+        self.replaced_count = 0  # type: int
+        self.dropped_count = 0  # type: int
+
+    def set_command(self, command, player_id=None, kind=None, target=None):
+        """
+        @description 发送命令（开启缓冲时在tick结束时统一发送）
+        :param command: 命令
+        :type command: str
+        :param player_id: 以该玩家身份执行（@s），为None时为全体（@a）
+        :type player_id: str | None
+        :param kind: 命令类型，用于合并，为None时不合并
+        :type kind: str | None
+        :param target: 命令中的目标选择器（例如 @a[tag=red]），用于合并与去重，默认为player_id或@a
+        :type target: str | None
+        """
+        if target is None:
+            target = player_id if player_id is not None else TARGET_ALL
+        if not self.enabled:
+            # 关闭缓冲时不丢弃命令，但仍然记录title状态，之后重新开启时的去重才是准确的
+            self._track_title_state(target, command, kind)
+            self._emit(command, player_id)
+            return
+        self.buffered_count += 1
+        if (kind == KIND_TIMES or kind == KIND_RESET) and self._is_repeated_title_state(target, command):
+            self.dropped_count += 1
+            return
+        self._track_title_state(target, command, kind)
+
+        index = len(self.entries)
+        if kind in BARRIER_KINDS:
+            self.last_barrier_index[target] = index
+            self.last_any_barrier_index = index
+            if _is_selector(target):
+                self.last_selector_barrier_index = index
+        elif kind is not None:
+            key = (target, kind)
+            previous = self.last_index.get(key)
+            if previous is not None and not self._has_barrier_after(target, kind, previous):
+                self.entries[previous] = None
+                self.replaced_count += 1
+            self.last_index[key] = index
+        self.entries.append([target, kind, command, player_id])
+
+    def flush(self):
+        """
+        @description 发送本tick内缓冲的所有命令
+        """
+        if not self.entries:
+            return
+        entries = self.entries
+        self.entries = list()
+        self.last_index.clear()
+        self.last_barrier_index.clear()
+        self.last_any_barrier_index = -1
+        self.last_selector_barrier_index = -1
+        for entry in entries:
+            if entry is not None:
+                self._emit(entry[2], entry[3])
+
+    def forget(self, player_id):
+        """
+        @description 清除某个玩家的title状态记录（玩家加入或离开时调用）
+        :type player_id: str
+        """
+        self.title_states.pop(player_id, None)
+        # 玩家列表变化后，全体的记录不再适用于所有玩家
+        self.title_states.pop(TARGET_ALL, None)
+
+    def get_stats(self):
+        """
+        @description 获取统计数据
+        :rtype: dict[str, int]
+        """
+        return {
+            'buffered': self.buffered_count,
+            'emitted': self.emitted_count,
+            'replaced': self.replaced_count,
+            'dropped': self.dropped_count,
+        }
+
+    def reset_stats(self):
+        self.buffered_count = 0
+        self.emitted_count = 0
+        self.replaced_count = 0
+        self.dropped_count = 0
+
+    # 内部方法
+
+    def _emit(self, command, player_id):
+        self.emitted_count += 1
+        if player_id is None:
+            self.part.SetCommand(command)
+        else:
+            self.part.SetCommand(command, player_id)
+
+    def _has_barrier_after(self, target, kind, index):
+        if kind == KIND_ACTIONBAR:
+            # actionbar不受title参数影响
+            return False
+        if target == TARGET_ALL or _is_selector(target):
+            return self.last_any_barrier_index > index
+        return self.last_barrier_index.get(target, -1) > index \
+            or self.last_barrier_index.get(TARGET_ALL, -1) > index \
+            or self.last_selector_barrier_index > index
+
+    @staticmethod
+    def _get_title_state(command):
+        # "title @s times 20 20 5" -> "times 20 20 5"，去掉目标选择器以便@a与@s之间比较
+        return command.split(' ', 2)[-1]
+
+    def _track_title_state(self, target, command, kind):
+        if kind == KIND_TIMES or kind == KIND_RESET:
+            self._update_title_state(target, command)
+        elif kind == KIND_SUBTITLE:
+            self._invalidate_reset_state(target)
+        elif kind is None and command.startswith('title '):
+            # 没有指定类型的title命令可能修改了任意玩家的显示参数，之前的记录都不再可靠
+            self.title_states.clear()
+
+    def _is_repeated_title_state(self, target, command):
+        if target == TARGET_ALL:
+            # 有玩家单独设置过时，全体的记录不代表所有玩家
+            if len(self.title_states) != 1:
+                return False
+            state = self.title_states.get(TARGET_ALL)
+        elif _is_selector(target):
+            # 不知道选择器包含哪些玩家，只与它自己的记录比较
+            state = self.title_states.get(target)
+        else:
+            state = self.title_states.get(target)
+            if state is None:
+                state = self.title_states.get(TARGET_ALL)
+        return state == self._get_title_state(command)
+
+    def _update_title_state(self, target, command):
+        if target == TARGET_ALL or _is_selector(target):
+            # 对全体生效后，单个玩家的记录都失效了；选择器可能包含任意玩家，其它记录也都不再可靠
+            self.title_states.clear()
+        else:
+            # 该玩家可能属于某个选择器
+            self._forget_selector_states()
+        self.title_states[target] = self._get_title_state(command)
+
+    def _forget_selector_states(self):
+        for key in list(self.title_states.keys()):
+            if _is_selector(key):
+                self.title_states.pop(key)
+
+    def _invalidate_reset_state(self, target):
+        # reset之后又设置了subtitle，再次reset就不是重复命令了
+        if target == TARGET_ALL or _is_selector(target):
+            for key in list(self.title_states.keys()):
+                if self.title_states[key] == KIND_RESET:
+                    self.title_states.pop(key)
+        else:
+            self._forget_selector_states()
+            if self.title_states.get(target, self.title_states.get(TARGET_ALL)) == KIND_RESET:
+                # 玩家没有单独记录时沿用全体的记录，这里单独记录为未知（空字符串不会与任何命令相同）
+                self.title_states[target] = ''
+
+
+def _is_selector(target):
+    # 除@a以外的目标选择器，例如 @a[tag=red]；玩家ID不以@开头
+    return target != TARGET_ALL and target.startswith('@')
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# 常用的组件类型，其它类型使用引擎组件工厂Create后面的名称，例如 'Player' -> CreatePlayer
+COMP_GAME = 'Game'
+COMP_ITEM = 'Item'
+COMP_PLAYER = 'Player'
+COMP_NAME = 'Name'
+
+
+class ComponentCache:
+    """
+    引擎组件的缓存 (组件类型, 实体ID) -> 组件，同一组件只创建一次
+    玩家离开时移除该玩家的组件（DelServerPlayerEvent），零件销毁时全部清空
+    """
+    def __init__(self, part):
+        self.part = part
+        # entity_id -> {component_type: component}，entity_id为None时为不属于实体的组件
+        self.components = {}  # type: dict[str | None, dict[str, object]]
+
+        # 统计
+        self.hit_count = 0  # type: int
+        self.miss_count = 0  # type: int
+
+    def get(self, component_type, entity_id=None, creator=None):
+        """
+        @description 获取组件，没有缓存时创建
+        :param component_type: 组件类型，例如 COMP_PLAYER
+        :type component_type: str
+        :param entity_id: 实体ID，为None时为全局组件
+        :type entity_id: str | None
+        :param creator: 创建组件的方法 creator(entity_id)，为None时使用引擎组件工厂
+        :type creator: callable | None
+        """
+        entity_components = self.components.get(entity_id)
+        if entity_components is not None:
+            component = entity_components.get(component_type)
+            if component is not None:
+                self.hit_count += 1
+                return component
+        self.miss_count += 1
+        component = creator(entity_id) if creator is not None else self._create(component_type, entity_id)
+        if component is not None:
+            if entity_components is None:
+                entity_components = {}
+                self.components[entity_id] = entity_components
+            entity_components[component_type] = component
+        return component
+
+    def get_game_component(self):
+        """
+        @description 获取游戏组件（GameComponent）
+        """
+        return self.get(COMP_GAME)
+
+    def evict(self, entity_id):
+        """
+        @description 移除某个实体的所有组件（玩家离开时调用）
+        :type entity_id: str
+        """
+        self.components.pop(entity_id, None)
+
+    def clear(self):
+        """
+        @description 移除所有组件（零件销毁时调用）
+        """
+        self.components.clear()
+
+    def get_stats(self):
+        """
+        @description 获取统计数据
+        :rtype: dict[str, int]
+        """
+        return {
+            'hits': self.hit_count,
+            'misses': self.miss_count,
+            'size': sum(len(entity_components) for entity_components in self.components.values()),
+        }
+
+    def reset_stats(self):
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def _create(self, component_type, entity_id):
+        if component_type == COMP_GAME and entity_id is None:
+            return self.part.CreateGameComponent()
+        factory = self.part.GetApi().GetEngineCompFactory()
+        return getattr(factory, 'Create' + component_type)(entity_id if entity_id is not None else self.part.GetLevelId())
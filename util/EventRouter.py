@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import operator
+
+# 事件参数中表示玩家或实体的字段，用于把事件路由到该玩家所在的竞技场（按顺序取第一个属于竞技场的ID）
+MEMBER_KEYS = ('playerId', 'player_id', 'entityId', 'id', 'srcId', 'victimId')
+
+_get_sequence = operator.attrgetter('sequence')
+
+
+def get_member_arena(member_arenas, args):
+    """
+    @description 根据事件参数找到所属的竞技场
+    :return: 竞技场ID，不属于任何竞技场时返回None
+    """
+    for key in MEMBER_KEYS:
+        member_id = args.get(key)
+        if member_id is not None:
+            arena_id = member_arenas.get(member_id)
+            if arena_id is not None:
+                return arena_id
+    return None
+
+
+class EventRoute:
+    """
+    单个事件 (namespace, system_name, event_name) 的路由
+    只向引擎注册一次，之后由状态的enter/exit来增删路由表中的监听器
+    """
+    def __init__(self, part, key):
+        self.part = part
+        self.key = key
+        # 没有指定key的监听器
+        self.listeners = list()  # type: list
+        # 其中属于默认根状态（不属于任何竞技场）的监听器
+        self.root_listeners = list()  # type: list
+        # arena_id -> 属于该竞技场的监听器
+        self.arena_listeners = {}  # type: dict[str, list]
+        # 指定了key的监听器 key -> {value: 监听器列表}，派发时每个key只查找一次
+        self.keyed_listeners = {}  # type: dict[str, dict[object, list]]
+        # 下一个加入的监听器的序号，多个列表中的监听器按序号（加入顺序）派发
+        self.next_sequence = 0  # type: int
+
+    def dispatch(self, args):
+        profiler = self.part.profiler
+        # 事件属于某个竞技场的玩家或实体时，分发给默认根状态（大厅）的监听器和该竞技场的监听器，不分发给其它竞技场；
+        # 否则分发给所有监听器。指定了key的监听器同样按竞技场过滤。所有监听器都按加入路由表的顺序调用
+        arena_id = None
+        if (self.arena_listeners or self.keyed_listeners) and self.part.member_arenas and isinstance(args, dict):
+            arena_id = get_member_arena(self.part.member_arenas, args)
+        # 复制一份再遍历，回调中可能会切换状态从而修改路由表
+        if arena_id is not None and self.arena_listeners:
+            listeners = self.root_listeners + self.arena_listeners.get(arena_id, [])
+            ordered = False
+        else:
+            # 没有竞技场的监听器时，listeners与root_listeners相同
+            listeners = list(self.listeners)
+            ordered = True
+        if self.keyed_listeners and isinstance(args, dict):
+            for key, index in self.keyed_listeners.items():
+                try:
+                    matched = index.get(args.get(key))
+                except TypeError:
+                    # 字段的值不能hash（例如列表），不会匹配任何监听器
+                    continue
+                if matched:
+                    for listener in matched:
+                        if arena_id is None or listener.arena_id is None or listener.arena_id == arena_id:
+                            listeners.append(listener)
+                            ordered = False
+        if not ordered:
+            listeners.sort(key=_get_sequence)
+        for listener in listeners:
+            # 所有监听器共用一个引擎监听，一个回调出错时不能影响后面的回调
+            try:
+                if profiler is None:
+                    listener.func(args)
+                else:
+                    # 与EventCallback.call相同，只在状态运行时触发
+                    event_callback = listener.instance
+                    if event_callback.state.is_state_running():
+                        profiler.call(event_callback.state.get_state_path(), 'event', event_callback.callback, args)
+            except Exception as e:
+                listener.instance.state._on_callback_error('event', e)
+
+
+class EventRouter:
+    """
+    零件内的事件路由表
+    每个事件只会向引擎监听一次，状态进入/退出时只修改路由表，不再反复调用ListenForEvent/UnListenForEvent
+    """
+    def __init__(self, part):
+        self.part = part
+        self.routes = {}  # type: dict[tuple, EventRoute]
+
+    def _get_route(self, namespace, system_name, event_name):
+        key = (namespace, system_name, event_name)
+        route = self.routes.get(key)
+        if route is None:
+            route = EventRoute(self.part, key)
+            self.routes[key] = route
+            # 第一次需要该事件时，才向引擎注册
+            if namespace is None and system_name is None:
+                self.part.ListenSelfEvent(event_name, route, route.dispatch)
+            else:
+                self.part.ListenForEvent(namespace, system_name, event_name, route, route.dispatch)
+        return route
+
+    def activate(self, listener):
+        """
+        @description 将监听器加入路由表（状态进入时调用）
+        :param listener: 监听上下文，namespace和system_name均为None时表示零件自身的事件
+        :type listener: EventListenContext
+        """
+        route = self._get_route(listener.namespace, listener.system_name, listener.event_name)
+        arena_id = self._get_arena_id(listener)
+        listener.arena_id = arena_id
+        listener.sequence = route.next_sequence
+        route.next_sequence += 1
+        if listener.key is not None:
+            # 指定了key的监听器只按值索引，派发时直接查找，再按竞技场过滤
+            index = route.keyed_listeners.get(listener.key)
+            if index is None:
+                index = {}
+                route.keyed_listeners[listener.key] = index
+            matched = index.get(listener.value)
+            if matched is None:
+                matched = list()
+                index[listener.value] = matched
+            matched.append(listener)
+            return
+        route.listeners.append(listener)
+        if arena_id is None:
+            route.root_listeners.append(listener)
+        else:
+            arena_listeners = route.arena_listeners.get(arena_id)
+            if arena_listeners is None:
+                arena_listeners = list()
+                route.arena_listeners[arena_id] = arena_listeners
+            arena_listeners.append(listener)
+
+    def deactivate(self, listener):
+        """
+        @description 将监听器移出路由表（状态退出时调用）
+        :param listener: 监听上下文
+        :type listener: EventListenContext
+        """
+        route = self.routes.get((listener.namespace, listener.system_name, listener.event_name))
+        if route is None:
+            return
+        if listener.key is not None:
+            index = route.keyed_listeners.get(listener.key)
+            matched = index.get(listener.value) if index is not None else None
+            if matched is not None and listener in matched:
+                matched.remove(listener)
+                if not matched:
+                    del index[listener.value]
+                    if not index:
+                        del route.keyed_listeners[listener.key]
+            return
+        if listener in route.listeners:
+            route.listeners.remove(listener)
+            arena_id = listener.arena_id
+            if arena_id is None:
+                route.root_listeners.remove(listener)
+                return
+            arena_listeners = route.arena_listeners.get(arena_id)
+            if arena_listeners is not None and listener in arena_listeners:
+                arena_listeners.remove(listener)
+                if not arena_listeners:
+                    del route.arena_listeners[arena_id]
+
+    @staticmethod
+    def _get_arena_id(listener):
+        # 监听器所属状态的根状态的竞技场ID
+        state = getattr(listener.instance, 'state', None)
+        root = state.get_root_state() if state is not None else None
+        return getattr(root, 'arena_id', None)
+
+    def clear(self):
+        """
+        @description 取消所有向引擎注册的监听（零件销毁时调用）
+        """
+        for key, route in self.routes.items():
+            namespace, system_name, event_name = key
+            if namespace is None and system_name is None:
+                self.part.UnListenSelfEvent(event_name, route, route.dispatch)
+            else:
+                self.part.UnListenForEvent(namespace, system_name, event_name, route, route.dispatch)
+        self.routes.clear()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+import time
+
+# 切换类型
+KIND_NEXT = 'next'
+KIND_TOGGLE = 'toggle'
+KIND_LOOP = 'loop'
+KIND_BUBBLE_UP = 'bubble-up'
+KIND_TIMEOUT = 'timeout'
+KIND_REMOVE = 'remove'
+
+# 本零件的包名，例如 GamingState.util.FlightRecorder -> GamingState.
+_PACKAGE_PREFIX = __name__[:-len('util.FlightRecorder')]
+# 查找触发切换的回调时跳过的状态机内部模块
+_INTERNAL_MODULES = frozenset(_PACKAGE_PREFIX + name for name in (
+    'state.GamingState', 'state.TimedGamingState', 'state.RootGamingState', 'state.OrderedSubStates',
+    'state.TransitionQueue', 'state.CoroutineGamingState', 'util.TimerWheel', 'util.EventRouter', 'util.TickProfiler', 'util.StateSnapshot', 'util.FlightRecorder',
+))
+# 到达零件的入口（TickServer等）时说明不是由回调触发的
+_BOUNDARY_MODULE = _PACKAGE_PREFIX + 'GamingStatePart'
+
+
+class FlightRecorder:
+    """
+    状态切换的记录（通过GamingStatePart.enable_flight_recorder开启）
+    固定大小的环形缓冲区，槽位预先分配；状态路径在记录时生成（状态退出后无法再得到路径，也不保留状态对象），回调名称在导出时才格式化
+    每条记录：时间、tick序号、状态路径、切换类型、切换前后的子状态，以及触发切换的回调
+    """
+    def __init__(self, part, capacity=1024, file_path='gaming_state_flight.json', dump_on_error=True):
+        """
+        :param part: 零件
+        :type part: GamingStatePart
+        :param capacity: 最多保留的记录数
+        :type capacity: int
+        :param file_path: 导出文件路径
+        :type file_path: str
+        :param dump_on_error: 状态回调出错时是否自动导出（每个tick最多一次）
+        :type dump_on_error: bool
+        """
+        self.part = part
+        self.capacity = capacity
+        self.file_path = file_path
+        self.dump_on_error = dump_on_error
+        self.times = [0.0] * capacity  # type: list[float]
+        self.ticks = [0] * capacity  # type: list[int]
+        self.paths = [None] * capacity  # type: list[str]
+        self.kinds = [None] * capacity  # type: list[str]
+        self.from_names = [None] * capacity  # type: list[str]
+        self.to_names = [None] * capacity  # type: list[str]
+        self.triggers = [None] * capacity  # type: list[tuple]
+        # 下一条记录的位置，以及总共记录过的数量
+        self.index = 0  # type: int
+        self.count = 0  # type: int
+        self.last_error_dump_tick = -1  # type: int
+
+    def record(self, kind, state, from_name, to_name):
+        """
+        @description 记录一次切换
+        :param kind: 切换类型，例如 KIND_NEXT
+        :type kind: str
+        :param state: 发生切换的状态（切换的是它的子状态）
+        :type state: GamingState
+        :param from_name: 切换前的子状态名称
+        :type from_name: str | None
+        :param to_name: 切换后的子状态名称
+        :type to_name: str | None
+        """
+        index = self.index
+        self.times[index] = time.time()
+        self.ticks[index] = self.part.tick_number
+        self.paths[index] = state.get_state_path()
+        self.kinds[index] = kind
+        self.from_names[index] = from_name
+        self.to_names[index] = to_name
+        self.triggers[index] = FlightRecorder._find_trigger()
+        self.index = (index + 1) % self.capacity
+        self.count += 1
+
+    def on_error(self):
+        """
+        @description 状态回调出错时调用
+        """
+        if self.dump_on_error and self.last_error_dump_tick != self.part.tick_number:
+            self.last_error_dump_tick = self.part.tick_number
+            try:
+                self.dump()
+            except (IOError, OSError) as e:
+                self.part.LogError("GamingState flight recorder dump error: " + str(e))
+
+    def get_entries(self):
+        """
+        @description 按时间顺序获取所有记录
+        :rtype: list[dict]
+        """
+        size = min(self.count, self.capacity)
+        start = (self.index - size) % self.capacity
+        entries = list()
+        for offset in range(size):
+            index = (start + offset) % self.capacity
+            entries.append({
+                'time': self.times[index],
+                'tick': self.ticks[index],
+                'path': self.paths[index],
+                'kind': self.kinds[index],
+                'from': self.from_names[index],
+                'to': self.to_names[index],
+                'trigger': FlightRecorder._format_trigger(self.triggers[index]),
+            })
+        return entries
+
+    def dump(self, file_path=None):
+        """
+        @description 将记录写入JSON文件
+        :param file_path: 文件路径，为None时使用创建时指定的路径
+        :type file_path: str | None
+        :rtype: list[dict]
+        """
+        entries = self.get_entries()
+        with open(file_path or self.file_path, 'w') as f:
+            json.dump({'dropped': max(0, self.count - self.capacity), 'entries': entries}, f, indent=2)
+        return entries
+
+    def clear(self):
+        for index in range(self.capacity):
+            self.paths[index] = None
+            self.triggers[index] = None
+        self.index = 0
+        self.count = 0
+
+    @staticmethod
+    def _find_trigger():
+        # 沿调用栈向上找到第一个不属于状态机内部的函数，只保存代码对象和行号
+        frame = sys._getframe(2)
+        while frame is not None:
+            module_name = frame.f_globals.get('__name__')
+            if module_name == _BOUNDARY_MODULE:
+                return None
+            if module_name not in _INTERNAL_MODULES:
+                return frame.f_code, frame.f_lineno
+            frame = frame.f_back
+        return None
+
+    @staticmethod
+    def _format_trigger(trigger):
+        if trigger is None:
+            return None
+        code, line = trigger
+        return "{} ({}:{})".format(code.co_name, code.co_filename, line)
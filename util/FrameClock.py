@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import time
+
+# 真实时间，每个tick读取一次time.time()
+CLOCK_WALL = 'wall'
+# 游戏tick数，每个tick固定前进tick_seconds秒（服务器卡顿时计时也随之变慢）
+CLOCK_TICKS = 'ticks'
+# 虚拟时间，只在调用advance时前进，用于测试和基准测试中快进
+CLOCK_VIRTUAL = 'virtual'
+
+CLOCK_MODES = (CLOCK_WALL, CLOCK_TICKS, CLOCK_VIRTUAL)
+
+
+class FrameClock(object):
+    """
+    根状态的帧时钟：每个tick开始时更新一次，同一tick中所有状态读取到的当前时间相同
+    """
+    __slots__ = ('mode', 'now', 'tick_seconds', 'wall_offset')
+
+    def __init__(self, mode=CLOCK_WALL, now=None, tick_seconds=0.05):
+        """
+        :param mode: 时钟类型，CLOCK_WALL、CLOCK_TICKS 或 CLOCK_VIRTUAL
+        :type mode: str
+        :param now: 初始时间（秒），为None时使用真实时间；切换时钟类型时传入之前的时间，已有的定时任务不受影响
+        :type now: float | None
+        :param tick_seconds: CLOCK_TICKS每个tick前进的时间（秒）
+        :type tick_seconds: float
+        """
+        if mode not in CLOCK_MODES:
+            raise ValueError("未知的时钟类型: {}".format(mode))
+        self.mode = mode
+        self.now = time.time() if now is None else now  # type: float
+        self.tick_seconds = tick_seconds  # type: float
+        # CLOCK_WALL时 now = time.time() + wall_offset，从其它类型切换过来时保持时间连续
+        self.wall_offset = self.now - time.time() if mode == CLOCK_WALL else 0.0  # type: float
+
+    def update(self):
+        """
+        @description 进入新的tick（根状态tick时调用）
+        :return: 当前时间（秒）
+        :rtype: float
+        """
+        if self.mode == CLOCK_WALL:
+            self.now = time.time() + self.wall_offset
+        elif self.mode == CLOCK_TICKS:
+            self.now += self.tick_seconds
+        return self.now
+
+    def advance(self, seconds):
+        """
+        @description 让虚拟时间前进
+        :param seconds: 前进的时间（秒）
+        :type seconds: float
+        """
+        if self.mode != CLOCK_VIRTUAL:
+            raise ValueError("只有虚拟时钟可以手动前进: {}".format(self.mode))
+        if seconds < 0:
+            raise ValueError("时间不能倒退: {}".format(seconds))
+        self.now += seconds
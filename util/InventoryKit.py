@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+
+from mod.common.minecraftEnum import ItemPosType
+
+from ComponentCache import COMP_ITEM
+
+# 套装中没有给出时，玩家物品的这些字段不为空说明与套装中的物品不同（附魔、自定义数据等）
+STATE_FIELDS = ('enchantData', 'modEnchantData', 'userData', 'customTips', 'extraId')
+
+
+class InventoryKit:
+    """
+    物品套装，定义一次后可以发给任意多个玩家
+    发放时先读取玩家当前的物品，只把有变化的格子通过一次SetPlayerAllItems发送
+    只处理套装中出现的和clear_pos_types中的位置类型，与BetterPlayerObject.clear_inventory不同，
+    不会清空鼠标上的物品和2x2合成格，需要时在发放前调用clear_inventory
+    """
+    def __init__(self, clear=True, clear_pos_types=(ItemPosType.INVENTORY, ItemPosType.ARMOR)):
+        """
+        :param clear: 是否清空套装中没有的格子
+        :type clear: bool
+        :param clear_pos_types: 需要清空的物品位置类型
+        :type clear_pos_types: tuple[int]
+        """
+        # (pos_type, slot) -> itemDict
+        self.items = {}  # type: dict[tuple[int, int], dict]
+        self.clear_pos_types = tuple(clear_pos_types) if clear else ()  # type: tuple[int]
+        self.pos_types = self.clear_pos_types  # type: tuple[int]
+        # (newItemName, newAuxValue) -> 最大耐久度，发放时从引擎读取一次
+        self.max_durability = {}  # type: dict[tuple[str, int], int]
+
+    def set_item(self, pos_type, slot, item_dict):
+        """
+        @description 设置套装中的物品
+        :param pos_type: 物品位置类型，例如 ItemPosType.INVENTORY
+        :type pos_type: int
+        :param slot: 格子
+        :type slot: int
+        :param item_dict: 物品信息字典，例如 {'newItemName': 'minecraft:stone_sword', 'newAuxValue': 0, 'count': 1}
+        :type item_dict: dict
+        :return: 套装本身，可以链式调用
+        :rtype: InventoryKit
+        """
+        self.items[(pos_type, slot)] = item_dict
+        if pos_type not in self.pos_types:
+            self.pos_types += (pos_type,)
+        return self
+
+    def get_diff(self, current_items):
+        """
+        @description 计算需要发送的格子，套装中没有给出耐久度时，耐久度不满的物品也算作有变化（需要先apply过一次读取最大耐久度）
+        :param current_items: 玩家当前的物品 pos_type -> GetPlayerAllItems的结果
+        :type current_items: dict[int, list[dict | None]]
+        :return: 可直接传给SetPlayerAllItems的 (pos_type, slot) -> itemDict | None，没有变化时为空
+        :rtype: dict[tuple[int, int], dict | None]
+        """
+        diff = {}
+        for pos_type in self.clear_pos_types:
+            for slot, current in enumerate(current_items.get(pos_type) or ()):
+                if current is not None and (pos_type, slot) not in self.items:
+                    diff[(pos_type, slot)] = None
+        for key, item_dict in self.items.items():
+            pos_type, slot = key
+            current_list = current_items.get(pos_type) or ()
+            current = current_list[slot] if slot < len(current_list) else None
+            max_durability = self.max_durability.get((item_dict.get('newItemName'), item_dict.get('newAuxValue', 0)), 0)
+            if not InventoryKit.is_same_item(current, item_dict, max_durability):
+                diff[key] = item_dict
+        return diff
+
+    def apply(self, part, player_id):
+        """
+        @description 把套装发给一个玩家
+        :type part: GamingStatePart
+        :type player_id: str
+        :return: 发送的格子数
+        :rtype: int
+        """
+        comp = part.component_cache.get(COMP_ITEM, player_id)
+        self._load_max_durability(comp)
+        current_items = {}
+        for pos_type in self.pos_types:
+            current_items[pos_type] = comp.GetPlayerAllItems(pos_type)
+        diff = self.get_diff(current_items)
+        if diff:
+            comp.SetPlayerAllItems(diff)
+        return len(diff)
+
+    def _load_max_durability(self, comp):
+        for item_dict in self.items.values():
+            key = (item_dict.get('newItemName'), item_dict.get('newAuxValue', 0))
+            if key not in self.max_durability:
+                info = comp.GetItemBasicInfo(key[0], key[1])
+                self.max_durability[key] = info.get('maxDurability', 0) if info else 0
+
+    @staticmethod
+    def is_same_item(current, item_dict, max_durability=0):
+        """
+        @description 玩家当前的物品是否与套装中的物品相同：套装中给出的字段都相同，
+        并且套装中没有给出的附魔、自定义数据等字段为空，耐久度为满
+        :type current: dict | None
+        :type item_dict: dict
+        :param max_durability: 物品的最大耐久度，为0时不比较耐久度
+        :type max_durability: int
+        :rtype: bool
+        """
+        if current is None:
+            return False
+        for key, value in item_dict.items():
+            if current.get(key) != value:
+                return False
+        for key in STATE_FIELDS:
+            if key not in item_dict and current.get(key):
+                return False
+        if max_durability > 0 and 'durability' not in item_dict and current.get('durability', max_durability) != max_durability:
+            return False
+        return True
+
+
+class InventoryKitQueue:
+    """
+    分摊到多个tick发放的套装队列，由GamingStatePart在TickServer中处理
+    """
+    def __init__(self, part):
+        self.part = part
+        # (kit, player_id)
+        self.pending = deque()  # type: deque[tuple[InventoryKit, str]]
+        # 每个tick最多发放的玩家数
+        self.players_per_tick = 0  # type: int
+
+        # 统计
+        self.player_count = 0  # type: int
+        self.skipped_count = 0  # type: int
+        self.slot_count = 0  # type: int
+
+    def apply(self, kit, player_id):
+        """
+        @description 立即把套装发给一个玩家
+        """
+        slot_count = kit.apply(self.part, player_id)
+        self.player_count += 1
+        self.slot_count += slot_count
+        if slot_count == 0:
+            self.skipped_count += 1
+
+    def push(self, kit, player_id):
+        self.pending.append((kit, player_id))
+
+    def process(self):
+        """
+        @description 发放本tick的份额
+        """
+        count = self.players_per_tick
+        pending = self.pending
+        while pending and count > 0:
+            kit, player_id = pending.popleft()
+            self.apply(kit, player_id)
+            count -= 1
+
+    def forget(self, player_id):
+        """
+        @description 移除还没有发放给该玩家的套装（玩家离开时调用）
+        :type player_id: str
+        """
+        if self.pending:
+            self.pending = deque(entry for entry in self.pending if entry[1] != player_id)
+
+    def get_stats(self):
+        """
+        @description 获取统计数据
+        :rtype: dict[str, int]
+        """
+        return {
+            'players': self.player_count,
+            'unchanged_players': self.skipped_count,
+            'slots': self.slot_count,
+            'pending': len(self.pending),
+        }
+
+    def reset_stats(self):
+        self.player_count = 0
+        self.skipped_count = 0
+        self.slot_count = 0
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+from CommandBuffer import KIND_ACTIONBAR, KIND_TITLE, KIND_SUBTITLE, KIND_RESET
+
+# HUD的显示通道
+HUD_ACTIONBAR = 'actionbar'
+HUD_TIP = 'tip'
+HUD_POPUP = 'popup'
+HUD_TITLE = 'title'
+
+HUD_CHANNELS = (HUD_ACTIONBAR, HUD_TIP, HUD_POPUP, HUD_TITLE)
+
+# 内容不变时重新发送的间隔（tick），为None时内容不变就不再发送
+# actionbar/tip/popup显示一段时间后会淡出，需要定期重新发送；title重新发送会重新播放淡入，默认不重发
+DEFAULT_REFRESH_TICKS = {
+    HUD_ACTIONBAR: 40,
+    HUD_TIP: 40,
+    HUD_POPUP: 40,
+    HUD_TITLE: None,
+}
+
+
+class PlayerHud:
+    """
+    每个玩家的HUD显示内容（通过GamingStatePart.hud使用）
+    记录每个玩家每个通道最后发送的内容，内容不变且没有到刷新间隔时不再发送，
+    例如每个tick都调用 part.hud.update(player_id, HUD_ACTIONBAR, state.get_formatted_time_left())，实际每秒只发送一次
+    """
+    def __init__(self, part):
+        self.part = part
+        self.refresh_ticks = dict(DEFAULT_REFRESH_TICKS)  # type: dict[str, int | None]
+        # player_id -> {channel: (内容, 发送时的tick序号)}
+        self.players = {}  # type: dict[str, dict[str, tuple]]
+        # 广播的内容 channel -> (内容, 发送时的tick序号)，之后单独发给某个玩家时移除
+        self.broadcasts = {}  # type: dict[str, tuple]
+        # 广播之后加入的玩家 channel -> player_id集合，下一次update_all时即使内容不变也单独发给他们
+        self.missed_broadcasts = {}  # type: dict[str, set]
+
+        # 统计 channel -> 数量
+        self.sent_counts = dict.fromkeys(HUD_CHANNELS, 0)  # type: dict[str, int]
+        self.suppressed_counts = dict.fromkeys(HUD_CHANNELS, 0)  # type: dict[str, int]
+
+    def set_refresh_interval(self, channel, ticks):
+        """
+        @description 设置内容不变时重新发送的间隔
+        :param channel: 通道，例如 HUD_ACTIONBAR
+        :type channel: str
+        :param ticks: 间隔（tick），为None时内容不变就不再发送
+        :type ticks: int | None
+        """
+        if channel not in HUD_CHANNELS:
+            raise ValueError("未知的HUD通道: {}".format(channel))
+        self.refresh_ticks[channel] = ticks
+
+    def update(self, player_id, channel, text, sub=None):
+        """
+        @description 更新一个玩家的HUD内容，与上次发送的相同时跳过
+        :param player_id: 玩家ID
+        :type player_id: str
+        :param channel: 通道，例如 HUD_ACTIONBAR
+        :type channel: str
+        :param text: 文本内容
+        :type text: str
+        :param sub: popup的副提示或title的副标题
+        :type sub: str | None
+        :return: 是否发送
+        :rtype: bool
+        """
+        content = (text, sub)
+        channels = self.players.get(player_id)
+        if channels is None:
+            channels = {}
+            self.players[player_id] = channels
+        if self._is_fresh(channels.get(channel), channel, content):
+            self.suppressed_counts[channel] += 1
+            return False
+        channels[channel] = (content, self.part.tick_number)
+        # 这个玩家的显示内容已经与广播的不同
+        self.broadcasts.pop(channel, None)
+        self.sent_counts[channel] += 1
+        self._send(player_id, channel, text, sub)
+        return True
+
+    def update_all(self, channel, text, sub=None):
+        """
+        @description 更新所有玩家的HUD内容（使用一次广播），与上次发送的相同时跳过
+        :param channel: 通道，例如 HUD_ACTIONBAR
+        :type channel: str
+        :param text: 文本内容
+        :type text: str
+        :param sub: popup的副提示或title的副标题
+        :type sub: str | None
+        :return: 是否发送
+        :rtype: bool
+        """
+        content = (text, sub)
+        missed_players = self.missed_broadcasts.pop(channel, None)
+        if self._is_fresh(self.broadcasts.get(channel), channel, content):
+            if not missed_players:
+                self.suppressed_counts[channel] += 1
+                return False
+            # 内容不变，只发给广播之后加入的玩家
+            record = (content, self.part.tick_number)
+            for player_id in missed_players:
+                channels = self.players.get(player_id)
+                if channels is None:
+                    channels = {}
+                    self.players[player_id] = channels
+                channels[channel] = record
+                self.sent_counts[channel] += 1
+                self._send(player_id, channel, text, sub)
+            return True
+        record = (content, self.part.tick_number)
+        self.broadcasts[channel] = record
+        for channels in self.players.values():
+            channels[channel] = record
+        self.sent_counts[channel] += 1
+        self._broadcast(channel, text, sub)
+        return True
+
+    def invalidate(self, player_id=None, channel=None):
+        """
+        @description 清除记录，下一次更新时一定发送（例如使用其它方式清空了玩家的HUD）
+        :param player_id: 玩家ID，为None时为所有玩家
+        :type player_id: str | None
+        :param channel: 通道，为None时为所有通道
+        :type channel: str | None
+        """
+        # 广播的记录也要清除，否则下一次update_all会被跳过
+        if channel is None:
+            self.broadcasts.clear()
+            self.missed_broadcasts.clear()
+        else:
+            self.broadcasts.pop(channel, None)
+            self.missed_broadcasts.pop(channel, None)
+        targets = self.players.values() if player_id is None else [self.players.get(player_id, {})]
+        for channels in targets:
+            if channel is None:
+                channels.clear()
+            else:
+                channels.pop(channel, None)
+
+    def join(self, player_id):
+        """
+        @description 玩家加入时调用：清除旧的记录，并在下一次update_all时把当前广播的内容发给该玩家
+        :type player_id: str
+        """
+        self.forget(player_id)
+        for channel in self.broadcasts:
+            missed_players = self.missed_broadcasts.get(channel)
+            if missed_players is None:
+                missed_players = set()
+                self.missed_broadcasts[channel] = missed_players
+            missed_players.add(player_id)
+
+    def forget(self, player_id):
+        """
+        @description 移除玩家的记录（玩家离开时调用）
+        :type player_id: str
+        """
+        self.players.pop(player_id, None)
+        for missed_players in self.missed_broadcasts.values():
+            missed_players.discard(player_id)
+
+    def get_stats(self):
+        """
+        @description 获取统计数据
+        :rtype: dict[str, dict[str, int]]
+        """
+        return {
+            'sent': dict(self.sent_counts),
+            'suppressed': dict(self.suppressed_counts),
+        }
+
+    def reset_stats(self):
+        for channel in HUD_CHANNELS:
+            self.sent_counts[channel] = 0
+            self.suppressed_counts[channel] = 0
+
+    def _is_fresh(self, record, channel, content):
+        # 与上次发送的内容相同，并且还没有到刷新间隔
+        if record is None or record[0] != content:
+            return False
+        refresh_ticks = self.refresh_ticks[channel]
+        return refresh_ticks is None or self.part.tick_number - record[1] < refresh_ticks
+
+    def _send(self, player_id, channel, text, sub):
+        part = self.part
+        if channel == HUD_ACTIONBAR:
+            part.command_buffer.set_command("title @s actionbar {}".format(text), player_id, KIND_ACTIONBAR)
+        elif channel == HUD_TIP:
+            part.component_cache.get_game_component().SetOneTipMessage(player_id, text)
+        elif channel == HUD_POPUP:
+            part.component_cache.get_game_component().SetOnePopupNotice(player_id, text, sub or "")
+        else:
+            # 与broadcast_title的顺序相同：重置后先设置副标题，再发送主标题
+            part.command_buffer.set_command("title @s reset", player_id, KIND_RESET)
+            if sub is not None:
+                part.command_buffer.set_command("title @s subtitle {}".format(sub), player_id, KIND_SUBTITLE)
+            part.command_buffer.set_command("title @s title {}".format(text), player_id, KIND_TITLE)
+
+    def _broadcast(self, channel, text, sub):
+        util = self.part.better_util
+        if channel == HUD_ACTIONBAR:
+            util.broadcast_actionbar(text)
+        elif channel == HUD_TIP:
+            util.broadcast_tip(text)
+        elif channel == HUD_POPUP:
+            util.broadcast_popup(text, sub or "")
+        else:
+            util.broadcast_title(text, sub)
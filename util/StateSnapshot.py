@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+SNAPSHOT_VERSION = 1
+# 写入时使用的临时文件后缀
+TEMP_SUFFIX = '.tmp'
+
+
+class StateSnapshot:
+    """
+    运行路径的快照（通过GamingStatePart.enable_snapshot开启）
+    只保存每个根状态当前运行路径上的状态：子状态名称、TimedGamingState的剩余时间以及状态的snapshot()数据
+    运行路径变化时标记为dirty，在TickServer结束时写入文件（每个tick最多写入一次），另外每隔refresh_interval秒刷新剩余时间
+    刷新间隔按根状态的时钟计算，与剩余时间使用同一个时钟（例如'virtual'时钟暂停时不刷新）
+    文件格式：{"v": 1, "roots": {"root": {"d": 根状态数据, "p": [{"n": 名称, "t": 剩余时间, "d": 数据}, ...]}}}
+    """
+    def __init__(self, part, file_path, refresh_interval=5.0):
+        """
+        :param part: 零件
+        :type part: GamingStatePart
+        :param file_path: 快照文件路径
+        :type file_path: str
+        :param refresh_interval: 运行路径没有变化时，刷新剩余时间的间隔（秒），为None时不刷新
+        :type refresh_interval: float | None
+        """
+        self.part = part
+        self.file_path = file_path
+        self.refresh_interval = refresh_interval
+        self.dirty = True  # type: bool
+        self.last_write_time = 0.0  # type: float
+        self.write_count = 0  # type: int
+
+    def update(self):
+        """
+        @description 需要时写入快照（每个tick结束时调用）
+        """
+        if not self.dirty:
+            if self.refresh_interval is None or self._get_time() - self.last_write_time < self.refresh_interval:
+                return
+        self.write()
+
+    def write(self):
+        """
+        @description 立即写入快照文件（先写入临时文件再替换，避免写入中途退出时损坏快照）
+        """
+        self.dirty = False
+        self.last_write_time = self._get_time()
+        self.write_count += 1
+        temp_path = self.file_path + TEMP_SUFFIX
+        with open(temp_path, 'w') as f:
+            json.dump(self.collect(), f, separators=(',', ':'))
+        if os.name != 'nt':
+            # POSIX的rename会原子地覆盖已有文件，任何时刻都有一个完整的快照
+            os.rename(temp_path, self.file_path)
+            return
+        # Windows下rename不能覆盖已有文件：删除后到改名前的这段时间只有临时文件，load时会读取它
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        os.rename(temp_path, self.file_path)
+
+    def _get_time(self):
+        return self.part.root_state.get_time() if self.part.root_state is not None else 0.0
+
+    def collect(self):
+        """
+        @description 收集所有根状态的运行路径
+        :rtype: dict
+        """
+        roots = {}
+        part = self.part
+        if part.root_state is not None:
+            roots[part.root_state.get_path_name()] = StateSnapshot.collect_root(part.root_state)
+        for arena in part.arena_order:
+            roots[arena.get_path_name()] = StateSnapshot.collect_root(arena)
+        return {'v': SNAPSHOT_VERSION, 'roots': roots}
+
+    @staticmethod
+    def collect_root(root):
+        path = list()
+        state = root
+        while state.current_sub_state is not None and state.current_sub_state is not state:
+            path.append(state.current_sub_state._snapshot_entry(state.current_sub_state_name))
+            state = state.current_sub_state
+        record = {'p': path}
+        data = root.snapshot()
+        if data is not None:
+            record['d'] = data
+        return record
+
+    @staticmethod
+    def load(file_path):
+        """
+        @description 读取快照文件（快照文件不存在时读取写入中途留下的临时文件）
+        :return: 快照数据 | 文件不存在或无法解析时返回None
+        :rtype: dict | None
+        """
+        if not os.path.exists(file_path):
+            # 临时文件写完之后才会删除旧的快照，此时临时文件是完整的；写入中途退出时无法解析，返回None
+            file_path += TEMP_SUFFIX
+            if not os.path.exists(file_path):
+                return None
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('v') != SNAPSHOT_VERSION:
+            return None
+        return data
+
+    @staticmethod
+    def restore_root(root, record):
+        """
+        @description 按快照进入运行路径上的各个状态，不会执行之前的状态
+        :type root: RootGamingState
+        :param record: collect_root的结果
+        :type record: dict
+        :return: 是否恢复了至少一层子状态
+        :rtype: bool
+        """
+        if 'd' in record:
+            root.restore(record['d'])
+        state = root
+        restored = False
+        for entry in record.get('p', ()):
+            name = entry.get('n')
+            if isinstance(name, unicode):
+                name = name.encode('utf-8')
+            if name not in state.sub_states:
+                # 状态树已经改变，从这一层开始正常进入
+                root.get_part().LogError("GamingState snapshot: sub state {} not found in {}".format(name, state.get_state_path()))
+                break
+            if state.current_sub_state is not None:
+                state._exit_current_sub_state()
+            sub_state = state._create_sub_state(name)
+            state._set_current_sub_state(name, sub_state)
+            sub_state.init()
+            sub_state._enter_self()
+            sub_state._restore_entry(entry)
+            state = sub_state
+            restored = True
+        if restored and state.current_sub_state is None:
+            state._enter_default_child()
+        if restored and root.get_part().state_snapshot is not None:
+            root.get_part().state_snapshot.dirty = True
+        return restored
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import re
+from collections import OrderedDict
+
+# 占位符 {name}，name中不包含花括号
+PLACEHOLDER_PATTERN = re.compile(r'\{([^{}]*)\}')
+# 可以安全地一次性替换的参数名（不会与颜色替换后的文本拼出新的占位符）
+SAFE_ARG_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+
+def to_utf8_str(value):
+    """
+    @description 与format_text一致的参数转换：unicode编码为utf-8，其他类型使用str()
+    :rtype: str
+    """
+    if isinstance(value, str):
+        return value
+    elif isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+
+
+class TextTemplate:
+    """
+    预编译的文本模板
+    编译时将原文拆分为文本段与占位符段，颜色等固定替换在编译时就已完成，渲染时只需一次拼接
+    """
+    def __init__(self, raw_msg, replacements):
+        """
+        :param raw_msg: 原始文本（str）
+        :type raw_msg: str
+        :param replacements: 固定替换表，优先于参数
+        :type replacements: dict[str, str | unicode]
+        """
+        # (文本, 占位符名称)，文本段的占位符名称为None，占位符段的文本为原样的"{name}"
+        self.segments = list()  # type: list[tuple[str, str | None]]
+        self.names = set()  # type: set[str]
+        literal = list()
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(raw_msg):
+            literal.append(raw_msg[position:match.start()])
+            position = match.end()
+            name = match.group(1)
+            if name in replacements:
+                literal.append(to_utf8_str(replacements[name]))
+                continue
+            if literal:
+                text = ''.join(literal)
+                if text:
+                    self.segments.append((text, None))
+                literal = list()
+            self.segments.append((match.group(0), name))
+            self.names.add(name)
+        literal.append(raw_msg[position:])
+        text = ''.join(literal)
+        if text or not self.segments:
+            self.segments.append((text, None))
+
+    def can_render(self, args):
+        """
+        @description 检查参数名是否可以一次性替换（参数名中带有颜色字符或花括号时，逐个替换的结果可能不同）
+        """
+        for name in args:
+            if not SAFE_ARG_NAME_PATTERN.match(name):
+                return False
+        return True
+
+    @staticmethod
+    def is_stable(result, args):
+        """
+        @description 检查渲染结果中是否出现了新的参数占位符
+        逐个str.replace时，参数值可能与相邻文本拼出新的占位符并被之后的参数替换，这种情况需要回退到逐个替换
+        """
+        if '{' not in result:
+            return True
+        for match in PLACEHOLDER_PATTERN.finditer(result):
+            if match.group(1) in args:
+                return False
+        return True
+
+    def render(self, args):
+        """
+        @description 使用参数渲染模板
+        :param args: 参数
+        :type args: dict
+        :rtype: str
+        """
+        if not self.names:
+            return self.segments[0][0]
+        parts = list()
+        for text, name in self.segments:
+            if name is not None and name in args:
+                parts.append(to_utf8_str(args[name]))
+            else:
+                parts.append(text)
+        return ''.join(parts)
+
+
+class TextTemplateCache:
+    """
+    有容量上限的模板缓存（LRU）
+    """
+    def __init__(self, replacements, max_size=256):
+        self.replacements = replacements
+        self.max_size = max_size
+        self.templates = OrderedDict()  # type: OrderedDict[str, TextTemplate]
+
+    def get(self, raw_msg):
+        """
+        @description 获取编译好的模板，没有时编译并缓存
+        :type raw_msg: str
+        :rtype: TextTemplate
+        """
+        template = self.templates.pop(raw_msg, None)
+        if template is None:
+            template = TextTemplate(raw_msg, self.replacements)
+            if len(self.templates) >= self.max_size:
+                self.templates.popitem(last=False)
+        self.templates[raw_msg] = template
+        return template
+
+    def clear(self):
+        self.templates.clear()
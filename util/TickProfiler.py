@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+# 耗时分布的桶上限（毫秒），最后一个桶为超过所有上限的调用
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 2, 5, 10, 20, 50)
+
+
+class CallbackStats(object):
+    """
+    单个回调的统计数据
+    """
+    __slots__ = ('count', 'total', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0  # type: int
+        self.total = 0.0  # type: float
+        self.max = 0.0  # type: float
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)  # type: list[int]
+
+    def add(self, elapsed_ms):
+        self.count += 1
+        self.total += elapsed_ms
+        if elapsed_ms > self.max:
+            self.max = elapsed_ms
+        index = 0
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if elapsed_ms <= bound:
+                break
+            index += 1
+        self.histogram[index] += 1
+
+
+class TickProfiler:
+    """
+    状态回调的耗时统计（通过GamingStatePart.enable_profiler开启）
+    按 (状态路径, 阶段, 回调) 统计调用次数、总耗时、最大耗时以及耗时分布
+    阶段：init / enter / exit / tick / event / timer
+    """
+    def __init__(self, part, slow_threshold_ms=10.0):
+        """
+        :param part: 零件
+        :type part: GamingStatePart
+        :param slow_threshold_ms: 慢回调阈值（毫秒），超过时输出日志，为None时不输出
+        :type slow_threshold_ms: float | None
+        """
+        self.part = part
+        self.slow_threshold_ms = slow_threshold_ms
+        self.stats = {}  # type: dict[tuple[str, str, str], CallbackStats]
+        self.callback_names = {}  # type: dict[object, str]
+        self.started_at = time.time()
+
+    def call(self, state_path, phase, callback, *args):
+        """
+        @description 调用回调并记录耗时，回调的异常会继续抛出
+        :param state_path: 状态路径，例如 root/game/stage1
+        :type state_path: str
+        :param phase: 阶段
+        :type phase: str
+        :param callback: 回调
+        :type callback: callable
+        """
+        start = time.time()
+        try:
+            return callback(*args)
+        finally:
+            self.record(state_path, phase, callback, (time.time() - start) * 1000.0)
+
+    def record(self, state_path, phase, callback, elapsed_ms):
+        callback_name = self.get_callback_name(callback)
+        key = (state_path, phase, callback_name)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = CallbackStats()
+            self.stats[key] = stats
+        stats.add(elapsed_ms)
+        if self.slow_threshold_ms is not None and elapsed_ms >= self.slow_threshold_ms:
+            self.part.LogInfo("GamingState slow callback {:.2f}ms: {} [{}] {}".format(elapsed_ms, state_path, phase, callback_name))
+
+    def get_callback_name(self, callback):
+        # 同一个函数的名称只计算一次
+        func = getattr(callback, '__func__', callback)
+        name = self.callback_names.get(func)
+        if name is None:
+            name = getattr(func, '__name__', None) or repr(func)
+            instance = getattr(callback, '__self__', None)
+            if instance is not None:
+                name = type(instance).__name__ + '.' + name
+            code = getattr(func, '__code__', None)
+            if code is not None and name.endswith('<lambda>'):
+                name = "{} ({}:{})".format(name, code.co_filename, code.co_firstlineno)
+            self.callback_names[func] = name
+        return name
+
+    def reset(self):
+        self.stats.clear()
+        self.started_at = time.time()
+
+    def to_dict(self):
+        """
+        @description 生成统计报告
+        :rtype: dict
+        """
+        states = {}
+        callbacks = list()
+        for key, stats in self.stats.items():
+            state_path, phase, callback_name = key
+            state = states.get(state_path)
+            if state is None:
+                state = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+                states[state_path] = state
+            state['count'] += stats.count
+            state['total_ms'] += stats.total
+            state['max_ms'] = max(state['max_ms'], stats.max)
+            callbacks.append({
+                'state': state_path,
+                'phase': phase,
+                'callback': callback_name,
+                'count': stats.count,
+                'total_ms': stats.total,
+                'max_ms': stats.max,
+                'avg_ms': stats.total / stats.count if stats.count else 0.0,
+                'histogram': stats.histogram,
+            })
+        callbacks.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {
+            'duration_s': time.time() - self.started_at,
+            'histogram_bounds_ms': list(HISTOGRAM_BOUNDS_MS),
+            'states': states,
+            'callbacks': callbacks,
+        }
+
+    def dump(self, file_path):
+        """
+        @description 将统计报告写入JSON文件
+        :param file_path: 文件路径
+        :type file_path: str
+        :rtype: dict
+        """
+        report = self.to_dict()
+        with open(file_path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        return report
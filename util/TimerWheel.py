@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import traceback
+
+
+class Timer(object):
+    """
+    时间轮中的一个定时任务
+    """
+    __slots__ = ('deadline', 'interval', 'callback', 'owner', 'cancelled')
+
+    def __init__(self, deadline, interval, callback, owner):
+        self.deadline = deadline  # type: float
+        self.interval = interval  # type: float | None
+        self.callback = callback  # type: callable
+        self.owner = owner  # type: GamingState | None
+        self.cancelled = False  # type: bool
+
+    def is_repeating(self):
+        return self.interval is not None
+
+
+class TimerWheel:
+    """
+    分层时间轮
+    每一层有 2^LEVEL_BITS 个槽，第0层每个槽对应一个resolution，上层每个槽对应下层的一整圈
+    每次推进只处理到期的槽，开销与到期的定时任务数相关，与存活的定时任务数无关
+    """
+    LEVEL_BITS = 6
+    LEVELS = 4
+    SLOTS = 1 << LEVEL_BITS
+    SLOT_MASK = SLOTS - 1
+    MAX_TICKS = 1 << (LEVEL_BITS * LEVELS)
+
+    def __init__(self, now, resolution=0.05, runner=None, error_handler=None):
+        """
+        :param now: 当前时间（秒）
+        :type now: float
+        :param resolution: 第0层每个槽的时间跨度（秒），默认一个服务端tick
+        :type resolution: float
+        :param runner: 执行到期定时任务的函数(timer)，为None时直接调用timer.callback()
+        :type runner: callable | None
+        :param error_handler: 回调异常时的处理函数(timer, exception)
+        :type error_handler: callable | None
+        """
+        self.resolution = resolution
+        self.runner = runner
+        self.error_handler = error_handler
+        self.current_tick = int(now / resolution)
+        self.wheels = [[list() for _ in range(TimerWheel.SLOTS)] for _ in range(TimerWheel.LEVELS)]
+        # 已经落入当前槽，但还差不到一个resolution才到期的定时任务
+        self.pending = list()  # type: list[Timer]
+        self.now = now
+
+    def schedule(self, timer):
+        """
+        @description 将定时任务放入时间轮
+        :type timer: Timer
+        """
+        self._place(timer, int(timer.deadline / self.resolution))
+        return timer
+
+    def cancel(self, timer):
+        """
+        @description 取消定时任务（惰性删除，推进到对应槽时丢弃）
+        :type timer: Timer
+        """
+        timer.cancelled = True
+
+    def advance(self, now):
+        """
+        @description 推进时间轮到指定时间，并触发所有到期的定时任务
+        :param now: 当前时间（秒）
+        :type now: float
+        """
+        self.now = now
+        if self.pending:
+            pending = self.pending
+            self.pending = list()
+            self._fire_all(pending, now)
+        target = int(now / self.resolution)
+        while self.current_tick < target:
+            self.current_tick += 1
+            index = self.current_tick & TimerWheel.SLOT_MASK
+            if index == 0:
+                self._cascade(1)
+            slot = self.wheels[0][index]
+            if slot:
+                self.wheels[0][index] = list()
+                self._fire_all(slot, now)
+
+    def _place(self, timer, tick, cascading=False):
+        delta = tick - self.current_tick
+        if delta == 0 and cascading:
+            # 级联时当前槽马上就会被处理
+            self.wheels[0][tick & TimerWheel.SLOT_MASK].append(timer)
+            return
+        if delta <= 0:
+            # 已经到期或落在当前槽，下次推进时检查
+            self.pending.append(timer)
+            return
+        if delta >= TimerWheel.MAX_TICKS:
+            tick = self.current_tick + TimerWheel.MAX_TICKS - 1
+            delta = TimerWheel.MAX_TICKS - 1
+        level = 0
+        while delta >= (1 << (TimerWheel.LEVEL_BITS * (level + 1))):
+            level += 1
+        index = (tick >> (TimerWheel.LEVEL_BITS * level)) & TimerWheel.SLOT_MASK
+        self.wheels[level][index].append(timer)
+
+    def _cascade(self, level):
+        if level >= TimerWheel.LEVELS:
+            return
+        index = (self.current_tick >> (TimerWheel.LEVEL_BITS * level)) & TimerWheel.SLOT_MASK
+        if index == 0:
+            self._cascade(level + 1)
+        slot = self.wheels[level][index]
+        if slot:
+            self.wheels[level][index] = list()
+            for timer in slot:
+                if not timer.cancelled:
+                    self._place(timer, int(timer.deadline / self.resolution), True)
+
+    def _fire_all(self, timers, now):
+        for timer in timers:
+            if timer.cancelled:
+                continue
+            if timer.deadline > now:
+                # 同一个槽内，但还没有真正到期
+                self.pending.append(timer)
+                continue
+            if timer.is_repeating():
+                timer.deadline += timer.interval
+                if timer.deadline <= now:
+                    # 卡顿了很久，不补发错过的次数
+                    timer.deadline = now + timer.interval
+                self.schedule(timer)
+            else:
+                timer.cancelled = True
+            try:
+                if self.runner is not None:
+                    self.runner(timer)
+                else:
+                    timer.callback()
+            except Exception as e:
+                if self.error_handler is not None:
+                    self.error_handler(timer, e)
+                traceback.print_exc()